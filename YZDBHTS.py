@@ -6,18 +6,34 @@ Advanced Plant Disease Detection System
 Version: 2.0
 """
 
-import numpy as np
-import tensorflow as tf
-import cv2
-from picamera import PiCamera
 import time
+_ACILIS = time.perf_counter()  # --profile-startup için başlangıç noktası
+
+import sys
 import os
-import json
 import argparse
+import hashlib
+import zlib
+from fnmatch import fnmatch
+import queue
+import threading
+import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import logging
 
+import numpy as np
+
+# OpenCV, TensorFlow/TFLite ve picamera burada içe aktarılmaz: yalnızca
+# onları kullanan kod yolunda yüklenirler; --help ve cron çağrıları ucuz kalır.
+from inference import (BACKENDS, import_runtime, load_backend, prepare_artifact,
+                       uses_artifact)
+from cache import PredictionCache, content_digest, model_identity
+from storage import BackgroundWriter, ResultLog, RunManifest
+from camera import CAMERA_SOURCES, open_camera
+
 
 # ===============================
 # CONFIGURATION / YAPILANDIRMA
@@ -27,14 +43,37 @@ class Config:
     """Sistem yapılandırma sınıfı"""
     HEDEF_BOYUT = (224, 224)
     MODEL_YOLU = 'YZDBHTS_colab.h5'
+    BACKEND = 'keras'  # 'keras' veya 'tflite'
+    TFLITE_IS_PARCACIGI = 4  # XNNPACK iş parçacığı sayısı
+    MODEL_ONBELLEGI = 'model_cache'  # Dönüştürülmüş model kopyaları (kaynak özetiyle)
     KAMERA_COZUNURLUK = (640, 480)
+    KAMERA_KAYNAGI = 'pi'  # 'pi', 'synthetic' ya da dosya/klasör yolu
+    KAMERA_ISINMA = 2.0  # Oturum açılırken kamera ısınma süresi (saniye)
+    CEKIM_ARALIGI = 0.0  # Sürekli modda iki çekim arası hedef süre (saniye)
+    CEKIM_BICIMI = 'jpeg'  # 'jpeg' ya da 'raw' (ham BGR dizisi, dosya G/Ç'si yok)
+    KARE_ADIMI = 5  # Videoda her kaç karede bir örnek alınacağı
+    DEGISIM_ESIGI = 6.0  # Sahne değişimi eşiği (gri seviye ortalama fark, 0 = her örnek)
+    YUMUSATMA = 0.3  # Skorlar için üstel ortalama ağırlığı (1 = yumuşatma yok)
     ETIKETLER = ["Külleme", "Leke", "Pas", "Sağlıklı"]
 
     # Yeni özellikler
     SONUC_KLASORU = 'results'
     LOG_KLASORU = 'logs'
     GORUNTU_KLASORU = 'captured_images'
+    SONUC_GUNLUGU = f'{SONUC_KLASORU}/log'  # Salt-ekleme JSONL segmentleri
+    MANIFEST_KLASORU = f'{SONUC_KLASORU}/manifests'  # Toplu işlem kontrol noktaları
+    ZAMAN_CIZELGESI = f'{SONUC_KLASORU}/timelines'  # Video bölümleri (JSONL)
     MIN_GUVEN_SKORU = 0.70  # %70'in altındaki tahminler şüpheli
+    BATCH_BOYUTU = 1  # Toplu işlemde tek ileri geçişteki görüntü sayısı
+    COZUCU_SAYISI = os.cpu_count() or 1  # Paralel görüntü çözücü iş parçacığı
+    KUYRUK_DERINLIGI = 64  # Aşamalar arası kuyruk kapasitesi
+    SUREC_SAYISI = 1  # Toplu işlemde her biri kendi modelini yükleyen süreç sayısı
+    ONBELLEK_BOYUTU = 1024  # Bellek içi LRU tahmin önbelleği kapasitesi
+    ONBELLEK_DOSYASI = f'{SONUC_KLASORU}/prediction_cache.sqlite'
+    YAZICI_KUYRUGU = 256  # Arka plan yazıcıda bekleyebilecek en fazla iş
+    ETIKET_KALITESI = 85  # Etiketli görüntülerin JPEG kalitesi
+    ETIKET_MAKS_KENAR = 1024  # Toplu işlemde etiketli görüntü uzun kenarı (0 = orijinal)
+    ETIKET_ISCI = os.cpu_count() or 1  # Toplu işlemde etiketleme iş parçacığı
 
     # Renk kodları (terminal çıktısı için)
     RENKLER = {
@@ -68,6 +107,33 @@ def setup_logging():
     return logging.getLogger(__name__)
 
 
+class StartupProfiler:
+    """--profile-startup için başlangıç aşamalarının süreleri
+
+    Ölçüm, yorumlayıcı açıldıktan sonra bu modülün ilk satırından başlar.
+    """
+
+    HEAVY_MODULES = ('tensorflow', 'tflite_runtime', 'cv2', 'picamera')
+
+    def __init__(self, start=_ACILIS):
+        self.start = self._last = start
+        self.phases = []
+
+    def mark(self, phase):
+        """Son işaretten bu yana geçen süreyi phase adıyla kaydet"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def report(self):
+        print("\n⏱️  BAŞLANGIÇ PROFİLİ:")
+        for phase, elapsed in self.phases:
+            print(f"  {phase:<28} {elapsed * 1000:9.1f} ms")
+        print(f"  {'Toplam':<28} {(self._last - self.start) * 1000:9.1f} ms")
+        loaded = [name for name in self.HEAVY_MODULES if name in sys.modules]
+        print(f"  Yüklenen ağır modüller: {', '.join(loaded) or 'yok'}\n")
+
+
 # ===============================
 # HELPER FUNCTIONS / YARDIMCI FONKSİYONLAR
 # ===============================
@@ -78,7 +144,9 @@ def create_directories():
         Config.SONUC_KLASORU,
         Config.LOG_KLASORU,
         Config.GORUNTU_KLASORU,
-        f"{Config.SONUC_KLASORU}/json",
+        Config.SONUC_GUNLUGU,
+        Config.MANIFEST_KLASORU,
+        Config.ZAMAN_CIZELGESI,
         f"{Config.SONUC_KLASORU}/annotated_images"
     ]
 
@@ -86,15 +154,45 @@ def create_directories():
         Path(directory).mkdir(parents=True, exist_ok=True)
 
 
-def load_model_safe(model_path, logger):
-    """Güvenli model yükleme"""
+def load_model_safe(model_path, logger, backend=Config.BACKEND,
+                    num_threads=Config.TFLITE_IS_PARCACIGI, warmup_sizes=(1,),
+                    profiler=None, model_cache=Config.MODEL_ONBELLEGI):
+    """Güvenli model yükleme
+
+    model_cache verilirse .h5 ilk çalıştırmada hızlı yüklenen biçime
+    dönüştürülür (soğuk başlangıç), sonraki çalıştırmalar dönüştürülmüş
+    kopyayı doğrudan yükler (sıcak başlangıç).
+    """
     try:
-        if not os.path.exists(model_path):
+        if backend == 'keras' and not os.path.exists(model_path):
             raise FileNotFoundError(f"Model dosyası bulunamadı: {model_path}")
 
-        logger.info(f"Model yükleniyor: {model_path}")
-        model = tf.keras.models.load_model(model_path, compile=False)
-        logger.info(f"✓ Model başarıyla yüklendi (Boyut: {os.path.getsize(model_path) / (1024 * 1024):.2f} MB)")
+        if profiler is not None:
+            # Kütüphane içe aktarma süresi model yüklemeden ayrı görünsün
+            import_runtime(backend)
+            profiler.mark(f"{backend} içe aktarma")
+
+        logger.info(f"Model yükleniyor: {model_path} ({backend})")
+        model = load_backend(backend, model_path, num_threads, model_cache)
+        logger.info(f"✓ Model başarıyla yüklendi (Boyut: {os.path.getsize(model.model_path) / (1024 * 1024):.2f} MB)")
+
+        info = model.load_info
+        if info['convert_time'] is not None:
+            logger.info(f"✓ Soğuk başlangıç: model dönüştürüldü {info['convert_time']:.3f} s "
+                        f"+ yükleme {info['load_time']:.3f} s ({info['artifact']})")
+        elif info['cached']:
+            logger.info(f"✓ Sıcak başlangıç: dönüştürülmüş model yüklendi "
+                        f"{info['load_time']:.3f} s ({info['artifact']})")
+        else:
+            logger.info(f"✓ Yükleme süresi: {info['load_time']:.3f} s")
+        if profiler is not None:
+            profiler.mark('Model yükleme')
+
+        # İlk gerçek tahmin izleme/ayırma maliyetini ödemesin
+        warmup_time = model.warmup(warmup_sizes)
+        logger.info(f"✓ Model ısındırıldı (batch: {sorted(set(warmup_sizes))}, {warmup_time:.3f} saniye)")
+        if profiler is not None:
+            profiler.mark('Isınma')
 
         return model
 
@@ -103,81 +201,160 @@ def load_model_safe(model_path, logger):
         raise
 
 
-def capture_image_safe(camera_resolution, logger):
-    """Güvenli görüntü yakalama"""
+def open_cache(model, logger, db_path=Config.ONBELLEK_DOSYASI,
+               capacity=Config.ONBELLEK_BOYUTU):
+    """Model kimliğine bağlı tahmin önbelleğini aç"""
     try:
-        camera = PiCamera()
-        camera.resolution = camera_resolution
+        cache = PredictionCache(model_identity(model), capacity, db_path)
+        logger.info(f"✓ Tahmin önbelleği hazır: {db_path} ({cache.model_id[:24]}…)")
+        return cache
+
+    except Exception as e:
+        logger.error(f"✗ Önbellek açılamadı, önbelleksiz devam ediliyor: {e}")
+        return None
 
-        logger.info("Kamera hazırlanıyor...")
-        time.sleep(2)  # Kamera odaklanma
 
+def open_camera_safe(source, logger, resolution=Config.KAMERA_COZUNURLUK,
+                     warmup=Config.KAMERA_ISINMA):
+    """Kamera oturumunu aç (ısınma yalnızca burada beklenir)"""
+    try:
+        logger.info(f"Kamera hazırlanıyor ({source})...")
+        camera = open_camera(source, resolution, warmup)
+        logger.info(f"✓ Kamera hazır: {camera.name} {resolution[0]}x{resolution[1]}")
+        return camera
+
+    except Exception as e:
+        logger.error(f"✗ Kamera açılamadı: {e}")
+        raise
+
+
+def save_capture(data, foto_yolu):
+    """Yakalanan JPEG baytlarını diske yaz"""
+    with open(foto_yolu, 'wb') as f:
+        f.write(data)
+
+
+def save_frame(frame, foto_yolu, quality=Config.ETIKET_KALITESI):
+    """Ham kareyi JPEG olarak diske yaz (arka plan yazıcıda çalışır)"""
+    import cv2
+    if not cv2.imwrite(foto_yolu, frame, [cv2.IMWRITE_JPEG_QUALITY, quality]):
+        raise IOError(f"Kare yazılamadı: {foto_yolu}")
+
+
+def capture_raw(camera, target_size, keep_original=False):
+    """Ham BGR kare yakala, (orijinal ya da None, boyutlanmış uint8) döndür
+
+    Orijinal gerekmiyorsa kare kameranın GPU'sunda doğrudan hedef boyuta
+    küçültülür. Gerekiyorsa (kaydetme/etiketleme) tam çözünürlükte alınır;
+    kamera tamponu yeniden kullanıldığı için arka plana bir kopyası verilir.
+    """
+    import cv2
+
+    if not keep_original:
+        return None, camera.capture_array(target_size)
+    frame = camera.capture_array()
+    return frame.copy(), cv2.resize(frame, target_size)
+
+
+def capture_image_safe(camera, logger):
+    """Güvenli görüntü yakalama; (dosya yolu, JPEG baytları) döndürür"""
+    try:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         foto_yolu = f"{Config.GORUNTU_KLASORU}/capture_{timestamp}.jpg"
 
-        camera.capture(foto_yolu)
-        camera.close()
+        data = camera.capture()
+        save_capture(data, foto_yolu)
 
         logger.info(f"✓ Fotoğraf kaydedildi: {foto_yolu}")
-        return foto_yolu
+        return foto_yolu, data
 
     except Exception as e:
         logger.error(f"✗ Kamera hatası: {e}")
         raise
 
 
-def preprocess_image(image_path, target_size, logger):
-    """Görüntü ön işleme"""
+def decode_image(image_path, target_size, logger, data=None):
+    """Görüntüyü oku ve hedef boyuta getir (iş parçacığı güvenli)"""
+    import cv2
+    from preprocessing import imdecode_reduced, imread_reduced
+
     try:
-        goruntu = cv2.imread(image_path)
+        # Büyük JPEG'ler hedef boyuta yetecek kadar küçük ölçekte çözülür.
+        # Ölçek yalnızca hedef boyuta bağlıdır; model girdisi etiketleme
+        # istense de istenmese de (ve web panelindekiyle) bit düzeyinde aynıdır
+        if data is None:
+            goruntu = imread_reduced(image_path, target_size)
+        else:
+            goruntu = imdecode_reduced(data, target_size)
 
         if goruntu is None:
             raise ValueError(f"Görüntü okunamadı: {image_path}")
 
-        # Resize
-        islenmis = cv2.resize(goruntu, target_size)
-
-        # Normalizasyon (MobileNetV2 için -1 ile 1 arası)
-        islenmis = np.expand_dims(islenmis, axis=0)
-        islenmis = (islenmis / 127.5) - 1
-
-        logger.info(f"✓ Görüntü işlendi: {islenmis.shape}")
-        return goruntu, islenmis
+        return goruntu, cv2.resize(goruntu, target_size)
 
     except Exception as e:
         logger.error(f"✗ Görüntü işleme hatası: {e}")
         raise
 
 
-def predict_disease(model, processed_image, logger):
+def preprocess_image(image_path, target_size, logger, preprocessor=None,
+                     data=None):
+    """Görüntü ön işleme (data verilirse dosya yeniden okunmaz)"""
+    from preprocessing import Preprocessor
+
+    goruntu, boyutlanmis = decode_image(image_path, target_size, logger, data)
+
+    # Normalizasyon (MobileNetV2 için -1 ile 1 arası, float32)
+    preprocessor = preprocessor or Preprocessor(target_size)
+    islenmis = preprocessor.batch([boyutlanmis])
+
+    logger.info(f"✓ Görüntü işlendi: {islenmis.shape}")
+    return goruntu, islenmis
+
+
+def build_result(scores, inference_time, cache_hit=False):
+    """Tek bir görüntünün skor vektöründen sonuç sözlüğü oluştur"""
+    en_yuksek_indeks = int(np.argmax(scores))
+    guven_skoru = float(scores[en_yuksek_indeks])
+
+    # Tüm sınıf skorlarını al
+    all_scores = {
+        Config.ETIKETLER[i]: float(scores[i])
+        for i in range(len(Config.ETIKETLER))
+    }
+
+    return {
+        'prediction': Config.ETIKETLER[en_yuksek_indeks],
+        'confidence': guven_skoru,
+        'all_scores': all_scores,
+        'inference_time': inference_time,
+        'timestamp': datetime.now().isoformat(),
+        'is_confident': guven_skoru >= Config.MIN_GUVEN_SKORU,
+        'cache_hit': cache_hit
+    }
+
+
+def predict_disease(model, processed_image, logger, cache=None, digest=None):
     """Hastalık tahmini yap"""
     try:
+        if cache is not None and digest is not None:
+            scores = cache.get(digest)
+            if scores is not None:
+                result = build_result(scores, 0.0, cache_hit=True)
+                logger.info(f"✓ Tahmin (önbellek): {result['prediction']} (%{result['confidence'] * 100:.2f})")
+                return result
+
         logger.info("Tahmin yapılıyor...")
 
         start_time = time.time()
-        tahminler = model.predict(processed_image, verbose=0)
+        tahminler = model.predict(processed_image)
         inference_time = time.time() - start_time
 
-        en_yuksek_indeks = np.argmax(tahminler)
-        sonuc_etiketi = Config.ETIKETLER[en_yuksek_indeks]
-        guven_skoru = tahminler[0][en_yuksek_indeks]
+        result = build_result(tahminler[0], inference_time)
+        if cache is not None and digest is not None:
+            cache.put(digest, tahminler[0])
 
-        # Tüm sınıf skorlarını al
-        all_scores = {
-            Config.ETIKETLER[i]: float(tahminler[0][i])
-            for i in range(len(Config.ETIKETLER))
-        }
-
-        result = {
-            'prediction': sonuc_etiketi,
-            'confidence': float(guven_skoru),
-            'all_scores': all_scores,
-            'inference_time': inference_time,
-            'timestamp': datetime.now().isoformat(),
-            'is_confident': guven_skoru >= Config.MIN_GUVEN_SKORU
-        }
-
-        logger.info(f"✓ Tahmin: {sonuc_etiketi} (%{guven_skoru * 100:.2f})")
+        logger.info(f"✓ Tahmin: {result['prediction']} (%{result['confidence'] * 100:.2f})")
         logger.info(f"✓ Süre: {inference_time:.3f} saniye")
 
         return result
@@ -187,47 +364,109 @@ def predict_disease(model, processed_image, logger):
         raise
 
 
-def save_results(result, image_path, logger):
+def predict_batch(model, batch, count, logger):
+    """Ön işlenmiş batch'i tek bir ileri geçişte tahmin et
+
+    batch sabit girdi şekli için sıfırlarla doldurulmuş olabilir; yalnızca
+    ilk count satırın sonuçları döndürülür.
+    """
+    try:
+        start_time = time.time()
+        tahminler = model.predict(batch)[:count]
+        inference_time = (time.time() - start_time) / count
+
+        logger.info(f"✓ Batch tahmini: {count} görüntü, "
+                    f"görüntü başına {inference_time:.3f} saniye")
+
+        return [build_result(scores, inference_time) for scores in tahminler]
+
+    except Exception as e:
+        logger.error(f"✗ Batch tahmin hatası: {e}")
+        raise
+
+
+def save_results(result, image, logger, result_log):
     """Sonuçları kaydet"""
     try:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
 
-        # JSON sonucu kaydet
-        json_path = f"{Config.SONUC_KLASORU}/json/result_{timestamp}.json"
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
+        # Sonucu salt-ekleme günlüğüne yaz (benzersiz kimlik atanır)
+        result_id = result_log.append(result)
 
-        logger.info(f"✓ Sonuç kaydedildi: {json_path}")
+        logger.info(f"✓ Sonuç kaydedildi: {result_id} ({result_log.directory})")
 
-        # Görüntüye etiket ekle
-        annotate_image(image_path, result, timestamp, logger)
+        # Görüntüye etiket ekle (bellekteki kare yeniden kullanılır)
+        annotate_image(image, result, timestamp, logger)
 
     except Exception as e:
         logger.error(f"✗ Sonuç kaydetme hatası: {e}")
 
 
-def annotate_image(image_path, result, timestamp, logger):
-    """Görüntüye sonuç etiketi ekle"""
-    try:
-        img = cv2.imread(image_path)
+def render_annotation(img, result, timestamp, max_side=0):
+    """Kareyi (gerekirse küçültüp) kopyası üzerine sonuç etiketini çiz"""
+    import cv2
+
+    if max_side and max(img.shape[:2]) > max_side:
+        scale = max_side / max(img.shape[:2])
+        img = cv2.resize(img, None, fx=scale, fy=scale,
+                         interpolation=cv2.INTER_AREA)
+    else:
+        img = img.copy()
+
+    # Etiket bilgileri
+    text = f"{result['prediction']} - %{result['confidence'] * 100:.1f}"
+
+    # Arka plan rengi (güven skoru düşükse kırmızı, yüksekse yeşil)
+    color = (0, 255, 0) if result['is_confident'] else (0, 0, 255)
+
+    # Metin ekle
+    cv2.putText(img, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
+                1, color, 2, cv2.LINE_AA)
+
+    # Zaman damgası ekle
+    cv2.putText(img, timestamp, (10, img.shape[0] - 10),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
-        # Etiket bilgileri
-        text = f"{result['prediction']} - %{result['confidence'] * 100:.1f}"
+    return img
 
-        # Arka plan rengi (güven skoru düşükse kırmızı, yüksekse yeşil)
-        color = (0, 255, 0) if result['is_confident'] else (0, 0, 255)
 
-        # Metin ekle
-        cv2.putText(img, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX,
-                    1, color, 2, cv2.LINE_AA)
+def decode_annotation_frame(data, max_side=0):
+    """Etiketleme karesini bellekteki görüntü baytlarından çöz
 
-        # Zaman damgası ekle
-        cv2.putText(img, timestamp, (10, img.shape[0] - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+    Model girdisinden ayrı çözülür: uzun kenarı max_side'ın altına inmeyecek
+    kadar küçültülür (0 = küçültme yok).
+    """
+    from preprocessing import imdecode_reduced
+    return imdecode_reduced(data, Config.HEDEF_BOYUT, max_side or sys.maxsize)
+
+
+def annotate_image(image, result, timestamp, logger, output_path=None,
+                   quality=Config.ETIKET_KALITESI, max_side=0):
+    """Görüntüye sonuç etiketi ekle
+
+    image çözülmüş bir kare, bellekteki görüntü baytları ya da dosya yolu
+    olabilir.
+    """
+    import cv2
+
+    try:
+        if isinstance(image, str):
+            img = cv2.imread(image)
+        elif isinstance(image, bytes):
+            img = decode_annotation_frame(image, max_side)
+        else:
+            img = image
+        if img is None:
+            raise ValueError(f"Görüntü okunamadı: {image}")
+
+        img = render_annotation(img, result, timestamp, max_side)
 
         # Kaydet
-        output_path = f"{Config.SONUC_KLASORU}/annotated_images/annotated_{timestamp}.jpg"
-        cv2.imwrite(output_path, img)
+        if output_path is None:
+            # Aynı saniyedeki sonuçlar birbirinin üzerine yazmasın
+            suffix = f"_{result['id'][:8]}" if 'id' in result else ''
+            output_path = f"{Config.SONUC_KLASORU}/annotated_images/annotated_{timestamp}{suffix}.jpg"
+        cv2.imwrite(output_path, img, [cv2.IMWRITE_JPEG_QUALITY, quality])
 
         logger.info(f"✓ Etiketli görüntü: {output_path}")
 
@@ -235,6 +474,46 @@ def annotate_image(image_path, result, timestamp, logger):
         logger.error(f"✗ Görüntü etiketleme hatası: {e}")
 
 
+class AnnotationPool:
+    """Toplu işlemde etiket çizme ve JPEG kodlamayı iş parçacığı havuzunda yapar
+
+    cv2 çizim/kodlama sırasında GIL'i bırakır; bekleyen iş sayısı
+    max_pending ile sınırlıdır, böylece çözülmüş kareler birikmez.
+    """
+
+    def __init__(self, logger, workers=Config.ETIKET_ISCI,
+                 quality=Config.ETIKET_KALITESI,
+                 max_side=Config.ETIKET_MAKS_KENAR, max_pending=64):
+        self.logger = logger
+        self.quality = quality
+        self.max_side = max_side
+        self.output_dir = Path(Config.SONUC_KLASORU) / 'annotated_images'
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix='annotate')
+
+    def submit(self, image, result, img_path):
+        """Bir sonucun etiketli görüntüsünü arka planda üret
+
+        Dosya adı sonucun kimliğini içerir (günlüğe de aynı kimlikle yazılır);
+        böylece aynı adlı görüntüler (img.jpg/img.png, alt klasörler, dilimler)
+        birbirinin çıktısının üzerine yazmaz.
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        result_id = result.setdefault('id', uuid.uuid4().hex)
+        output_path = str(self.output_dir / f"annotated_{img_path.stem}_{result_id[:8]}.jpg")
+
+        self._slots.acquire()
+        future = self._executor.submit(annotate_image, image, result, timestamp,
+                                       self.logger, output_path, self.quality,
+                                       self.max_side)
+        future.add_done_callback(lambda _: self._slots.release())
+
+    def close(self):
+        """Bekleyen tüm etiketleme işlerini bitir"""
+        self._executor.shutdown(wait=True)
+
+
 def print_detailed_result(result):
     """Detaylı sonucu terminale yazdır"""
     pred = result['prediction']
@@ -261,36 +540,564 @@ def print_detailed_result(result):
     print("\n" + "=" * 60 + "\n")
 
 
-def batch_process_images(model, image_folder, logger):
-    """Toplu görüntü işleme"""
-    image_files = list(Path(image_folder).glob("*.jpg")) + \
-                  list(Path(image_folder).glob("*.png"))
+# ===============================
+# CONTINUOUS MODE / SÜREKLİ ÇEKİM
+# ===============================
+
+def run_continuous(model, camera, logger, interval=Config.CEKIM_ARALIGI,
+                   writer=None, result_log=None, max_frames=None, raw=False):
+    """Açık kamera oturumundan arka arkaya kare yakala ve sınıflandır
+
+    Kareler bellekte çözülür (raw=True ise hiç JPEG'e dönüşmez); writer ve
+    result_log verilirse (--save-results) kare ve sonuç arka planda
+    kaydedilir. interval, bir çekimin başlangıcından diğerininkine hedef
+    süredir (0 = bekleme yok). Kare sayısını döndürür.
+    """
+    from preprocessing import Preprocessor
+
+    preprocessor = Preprocessor(Config.HEDEF_BOYUT)
+    frames = 0
+    started = time.perf_counter()
+
+    try:
+        while max_frames is None or frames < max_frames:
+            frame_start = time.perf_counter()
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            foto_yolu = f"{Config.GORUNTU_KLASORU}/capture_{timestamp}.jpg"
+            try:
+                if raw:
+                    data = None
+                    original, resized = capture_raw(camera, Config.HEDEF_BOYUT,
+                                                    writer is not None)
+                else:
+                    data = camera.capture()
+                    original, resized = decode_image(foto_yolu, Config.HEDEF_BOYUT,
+                                                     logger, data)
+            except EOFError:
+                break
+            except ValueError:
+                continue  # Bozuk kare atlanır, oturum açık kalır
+
+            # Canlı kareler tekrarlanmaz; tahmin önbelleğine bakılmaz ve
+            # yazılmaz (disk katmanı her kareyle sınırsız büyürdü)
+            result = predict_disease(model, preprocessor.batch([resized]), logger)
+            frames += 1
+
+            capture_time = time.perf_counter() - frame_start
+            logger.info(f"[{frames}] {result['prediction']} "
+                        f"(%{result['confidence'] * 100:.1f}) "
+                        f"{capture_time * 1000:.0f} ms")
+
+            if writer is not None:
+                # Etiketli kare JPEG baytlarından tam çözünürlükte, yazıcıda çözülür
+                if data is not None:
+                    writer.submit(save_capture, data, foto_yolu)
+                    writer.submit(save_results, result, data, logger, result_log)
+                else:
+                    writer.submit(save_frame, original, foto_yolu)
+                    writer.submit(save_results, result, original, logger, result_log)
+
+            remaining = interval - (time.perf_counter() - frame_start)
+            if remaining > 0:
+                time.sleep(remaining)
+
+    finally:
+        elapsed = time.perf_counter() - started
+        if frames:
+            logger.info(f"✓ Sürekli çekim: {frames} kare, {elapsed:.1f} s "
+                        f"({frames / elapsed:.2f} kare/s)")
+
+    return frames
+
+
+# ===============================
+# VIDEO MODE / VİDEO MODU
+# ===============================
+
+def run_video(model, source, logger, timeline_log, stride=Config.KARE_ADIMI,
+              threshold=Config.DEGISIM_ESIGI, alpha=Config.YUMUSATMA,
+              max_frames=None):
+    """Video dosyası ya da akışı örnekleyerek sınıflandır
+
+    Her stride karede bir kare çözülür; sahne son çıkarımdan bu yana
+    değişmediyse önceki skorlar yeniden kullanılır. Yumuşatılmış tahmin
+    aynı kaldıkça kareler tek bölümde toplanır ve her bölüm timeline_log'a
+    bir satır olarak eklenir. Özet sayaçları döndürür.
+    """
+    import cv2
+    from preprocessing import Preprocessor
+    from video import ChangeDetector, ScoreSmoother, SegmentTracker, open_video
+
+    capture = open_video(source)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+    logger.info(f"✓ Video açıldı: {source} ({fps:.1f} fps, her {stride} karede bir örnek)")
+
+    def on_segment(segment):
+        segment.update({'source': str(source), 'run': run_id})
+        timeline_log.append(segment)
+        logger.info(f"  {segment['start']:8.1f}s - {segment['end']:8.1f}s  "
+                    f"{segment['prediction']} (%{segment['confidence'] * 100:.1f}, "
+                    f"{segment['frames']} örnek, {segment['inferences']} çıkarım)")
+
+    preprocessor = Preprocessor(Config.HEDEF_BOYUT)
+    detector = ChangeDetector(threshold)
+    smoother = ScoreSmoother(alpha)
+    tracker = SegmentTracker(Config.ETIKETLER, on_segment, Config.MIN_GUVEN_SKORU)
+    counts = {'frames': 0, 'sampled': 0, 'inferences': 0}
+    scores = None
+    started = time.perf_counter()
+
+    try:
+        while max_frames is None or counts['sampled'] < max_frames:
+            # Atlanan kareler çözülmeden geçilir (grab), yalnızca örnek çözülür
+            if not capture.grab():
+                break
+            frame_index = counts['frames']
+            counts['frames'] += 1
+            if frame_index % stride:
+                continue
+
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            counts['sampled'] += 1
+            seconds = frame_index / fps if fps else time.perf_counter() - started
+
+            # changed() her örnekte çağrılır; ilk kare de referans olarak saklanır
+            changed = detector.changed(frame)
+            inferred = changed or scores is None
+            if inferred:
+                batch = preprocessor.batch([preprocessor.resize(frame)])
+                scores = model.predict(batch)[0]
+                counts['inferences'] += 1
+
+            tracker.add(frame_index, seconds, smoother.update(scores), inferred)
+
+    finally:
+        tracker.close()
+        capture.release()
+        timeline_log.flush()
+        counts['segments'] = tracker.segments
+        elapsed = time.perf_counter() - started
+        logger.info(f"✓ Video: {counts['frames']} kare, {counts['sampled']} örnek, "
+                    f"{counts['inferences']} çıkarım, {tracker.segments} bölüm, "
+                    f"{elapsed:.1f} s")
+
+    return counts
 
-    logger.info(f"Toplu işlem başlıyor: {len(image_files)} görüntü")
 
-    results = []
+# ===============================
+# PIPELINE / İŞLEM HATTI
+# ===============================
+
+_BITTI = object()  # Kuyruk sonu işareti
+
+
+def _put(q, item, stop):
+    """Durdurma isteği gelene kadar sınırlı kuyruğa eklemeyi dene"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _decode_job(img_path, cache, logger, annotate=False):
+    """(özet, önbellekteki skorlar, boyutlandırılmış görüntü, baytlar) döndür
+
+    Önbellekte bulunan görüntüler hiç çözülmez. annotate True ise görüntü
+    baytları da döndürülür; etiketleme karesi bunlardan etiketleme havuzunda
+    ayrıca çözülür, model girdisi her zaman çıkarım ölçeğinde çözülür.
+    """
+    data = digest = scores = None
+    if cache is not None or annotate:
+        data = img_path.read_bytes()
+    if cache is not None:
+        digest = content_digest(data)
+        scores = cache.get(digest)
+
+    resized = None
+    if scores is None:
+        _, resized = decode_image(str(img_path), Config.HEDEF_BOYUT, logger, data)
+    return digest, scores, resized, data if annotate else None
+
+
+def _decode_stage(image_files, executor, decoded_queue, stop, cache,
+                  annotate, logger):
+    """Çözme işlerini havuza gönder, future'ları sırayla kuyruğa koy"""
     for img_path in image_files:
+        future = executor.submit(_decode_job, img_path, cache, logger,
+                                 annotate)
+        if not _put(decoded_queue, (img_path, future), stop):
+            future.cancel()
+            return
+    _put(decoded_queue, _BITTI, stop)
+
+
+def _writer_stage(result_queue, on_result, logger):
+    """Sonuçları üretildikleri sırayla dışarı aktar"""
+    while True:
+        item = result_queue.get()
+        if item is _BITTI:
+            return
+        img_path, result = item
         try:
-            original, processed = preprocess_image(str(img_path),
-                                                   Config.HEDEF_BOYUT, logger)
-            result = predict_disease(model, processed, logger)
-            result['image_path'] = str(img_path)
-            results.append(result)
+            on_result(img_path, result)
+        except Exception as e:
+            logger.error(f"✗ {img_path.name} sonucu yazılamadı: {e}")
+
+
+def run_pipeline(model, image_files, logger, on_result,
+                 batch_size=Config.BATCH_BOYUTU,
+                 decode_workers=Config.COZUCU_SAYISI,
+                 queue_depth=Config.KUYRUK_DERINLIGI, cache=None,
+                 annotator=None):
+    """Çözme, çıkarım ve yazma aşamalarını üst üste bindirerek çalıştır
+
+    Çözücü havuzu en fazla queue_depth görüntü önden gider; çıkarım bu
+    kuyruktan batch'ler toplar, yazıcı iş parçacığı on_result'u çağırır.
+    annotator verilirse görüntü baytları etiketleme havuzuna aktarılır.
+    """
+    from preprocessing import Preprocessor
+
+    annotate = annotator is not None
+    decoded_queue = queue.Queue(maxsize=queue_depth)
+    result_queue = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+
+    executor = ThreadPoolExecutor(max_workers=decode_workers,
+                                  thread_name_prefix='decode')
+    producer = threading.Thread(target=_decode_stage, daemon=True,
+                                args=(image_files, executor, decoded_queue,
+                                      stop, cache, annotate, logger))
+    writer = threading.Thread(target=_writer_stage, daemon=True,
+                              args=(result_queue, on_result, logger))
+    producer.start()
+    writer.start()
+
+    # Son yarım batch sıfırlarla doldurulur, böylece girdi şekli sabit kalır
+    preprocessor = Preprocessor(Config.HEDEF_BOYUT, batch_size)
+    pending = []  # (img_path, digest, cached_scores, resized, data)
+
+    def flush():
+        misses = [item for item in pending if item[2] is None]
+        batch_results = []
+        if misses:
+            try:
+                batch = preprocessor.batch([item[3] for item in misses],
+                                           pad_to=batch_size)
+                batch_results = predict_batch(model, batch, len(misses), logger)
+            except Exception as e:
+                logger.error(f"✗ {len(misses)} görüntülük batch işlenemedi: {e}")
+                misses = []
+
+        computed = {}
+        for (img_path, _, _, _, _), result in zip(misses, batch_results):
+            computed[img_path] = result
+        # Batch'in tüm skorları tek commit ile önbelleğe yazılır
+        if cache is not None and batch_results:
+            cache.put_many([(digest, [result['all_scores'][label]
+                                      for label in Config.ETIKETLER])
+                            for (_, digest, _, _, _), result
+                            in zip(misses, batch_results)])
+
+        # Girdi sırası korunur; önbellek isabetleri çıkarıma girmez
+        for img_path, _, scores, _, data in pending:
+            if scores is not None:
+                result = build_result(scores, 0.0, cache_hit=True)
+            elif img_path in computed:
+                result = computed[img_path]
+            else:
+                continue
+
+            if annotator is not None:
+                annotator.submit(data, result, img_path)
+            result_queue.put((img_path, result))
+        pending.clear()
 
-            print(f"✓ {img_path.name}: {result['prediction']} (%{result['confidence'] * 100:.1f})")
+    try:
+        while True:
+            item = decoded_queue.get()
+            if item is _BITTI:
+                break
 
-        except Exception as e:
-            logger.error(f"✗ {img_path.name} işlenemedi: {e}")
+            img_path, future = item
+            try:
+                digest, scores, resized, data = future.result()
+            except Exception as e:
+                logger.error(f"✗ {img_path.name} işlenemedi: {e}")
+                continue
+
+            pending.append((img_path, digest, scores, resized, data))
+            if len(pending) >= batch_size:
+                flush()
+
+        if pending:
+            flush()
 
-    # Toplu sonuçları kaydet
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    batch_result_path = f"{Config.SONUC_KLASORU}/json/batch_result_{timestamp}.json"
+    finally:
+        stop.set()
+        producer.join()
+        executor.shutdown(wait=True, cancel_futures=True)
+        result_queue.put(_BITTI)
+        writer.join()
+
+
+def _matches(rel_path, name, patterns):
+    return any(fnmatch(rel_path, p) or fnmatch(name, p) for p in patterns)
+
+
+def scan_images(image_folder, recursive=False, include=None, exclude=None,
+                min_size=0, max_size=None, newer_than=None, shard=None,
+                logger=None):
+    """Klasörü os.scandir ile tembelce tara, uygun görüntü yollarını üret
+
+    Liste önceden kurulmaz; ilk dosya bulunur bulunmaz işlem hattına akar.
+    include/exclude desenleri göreli yola veya dosya adına uygulanır;
+    newer_than bir Unix zaman damgasıdır. shard=(i, n) verilirse yalnızca
+    yolunun CRC32 özeti n'e bölümünden i kalan dosyalar üretilir.
+    """
+    from preprocessing import IMAGE_EXTENSIONS
+
+    stack = [str(image_folder)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            stack.append(entry.path)
+                        continue
+
+                    name = entry.name
+                    if '.' not in name or name.rsplit('.', 1)[1].lower() not in IMAGE_EXTENSIONS:
+                        continue
+                    if not entry.is_file():
+                        continue
+
+                    rel_path = os.path.relpath(entry.path, image_folder)
+                    if include and not _matches(rel_path, name, include):
+                        continue
+                    if exclude and _matches(rel_path, name, exclude):
+                        continue
+
+                    if shard is not None:
+                        index, count = shard
+                        if zlib.crc32(entry.path.encode('utf-8')) % count != index:
+                            continue
+
+                    if min_size or max_size is not None or newer_than is not None:
+                        stat = entry.stat()
+                        if stat.st_size < min_size:
+                            continue
+                        if max_size is not None and stat.st_size > max_size:
+                            continue
+                        if newer_than is not None and stat.st_mtime <= newer_than:
+                            continue
+
+                    yield Path(entry.path)
+
+        except OSError as e:
+            if logger is not None:
+                logger.error(f"✗ Klasör okunamadı: {directory} ({e})")
+
+
+def open_manifest(image_folder, resume, logger):
+    """Girdi klasörünün kontrol noktasını aç, (manifest, batch_id) döndür
+
+    resume verilmezse önceki kayıtlar silinir ve yeni bir batch_id alınır.
+    """
+    key = hashlib.sha1(os.path.abspath(image_folder).encode('utf-8')).hexdigest()[:16]
+    manifest = RunManifest(Path(Config.MANIFEST_KLASORU) / f"{key}.sqlite")
+
+    batch_id = manifest.get_meta('batch_id') if resume else None
+    if batch_id is None:
+        manifest.reset()
+        batch_id = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        manifest.set_meta('batch_id', batch_id)
+        manifest.set_meta('input_folder', os.path.abspath(image_folder))
+    else:
+        done = sum(manifest.counts().values())
+        logger.info(f"✓ Kaldığı yerden devam ediliyor: {batch_id} "
+                    f"({done} görüntü zaten işlenmiş)")
+
+    return manifest, batch_id
+
+
+def stream_results(result_log, manifest, batch_id, writer=None):
+    """Sonuçları üretildikçe günlüğe ve kontrol noktasına yazan on_result döndür
+
+    Günlük flush'ı ve manifest commit'i yazıcının her toplu işinde bir kez
+    yapılır; bir sonuç ancak günlüğe yazıldıktan sonra işlendi sayılır.
+    """
+    def checkpoint():
+        result_log.flush()
+        manifest.commit()
+
+    def persist(result):
+        result_log.append(result, flush=False)
+        manifest.mark(result['image_path'], result['prediction'])
+
+    def on_result(img_path, result):
+        result['image_path'] = str(img_path)
+        result['batch_id'] = batch_id
+        if writer is None:
+            persist(result)
+            checkpoint()
+        else:
+            writer.submit(persist, result, flush=checkpoint)
+
+        print(f"✓ {img_path.name}: {result['prediction']} (%{result['confidence'] * 100:.1f})")
+
+    return on_result
+
+
+def score_images(model, image_files, logger, on_result,
+                 batch_size=Config.BATCH_BOYUTU,
+                 decode_workers=Config.COZUCU_SAYISI,
+                 queue_depth=Config.KUYRUK_DERINLIGI, cache=None,
+                 annotator=None, manifest=None):
+    """Görüntüleri işlem hattından geçir; manifestte olanları atla"""
+    if manifest is not None:
+        image_files = (p for p in image_files if not manifest.is_done(str(p)))
+
+    run_pipeline(model, image_files, logger, on_result, batch_size,
+                 decode_workers, queue_depth, cache, annotator)
+
+
+def batch_process_images(model, image_folder, logger, result_log,
+                         batch_size=Config.BATCH_BOYUTU,
+                         decode_workers=Config.COZUCU_SAYISI,
+                         queue_depth=Config.KUYRUK_DERINLIGI, cache=None,
+                         writer=None, annotator=None, resume=False,
+                         scan_options=None):
+    """Toplu görüntü işleme
+
+    Sonuçlar bellekte biriktirilmez, üretildikçe diske akar; dönen değer
+    çalıştırmanın {tahmin: sayı} özetidir. scan_options scan_images'a
+    aktarılır.
+    """
+    image_files = scan_images(image_folder, logger=logger, **(scan_options or {}))
+    manifest, batch_id = open_manifest(image_folder, resume, logger)
+
+    logger.info(f"Toplu işlem başlıyor: {image_folder} "
+                f"(batch boyutu: {batch_size}, çözücü: {decode_workers})")
+
+    try:
+        on_result = stream_results(result_log, manifest, batch_id, writer)
+        score_images(model, image_files, logger, on_result, batch_size,
+                     decode_workers, queue_depth, cache, annotator, manifest)
+    finally:
+        # Ctrl+C'de de yazılmış her sonuç kontrol noktasına işlenir
+        if writer is not None:
+            writer.drain()
+        counts = manifest.counts()
+        manifest.close()
+
+    logger.info(f"✓ Toplu işlem tamamlandı: {batch_id} "
+                f"({sum(counts.values())} sonuç, {result_log.directory})")
+    return counts
+
+
+def _shard_worker(image_folder, shard, scan_options, model_path, backend,
+                  num_threads, batch_size, decode_workers, queue_depth,
+                  use_cache, annotate_options, manifest_path, batch_id,
+                  model_cache):
+    """Alt süreç: kendi modelini yükleyip bir dilimi işle
 
-    with open(batch_result_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    Dilim, klasör alt süreçte taranırken seçilir; ana süreç listeyi kurmaz.
+    """
+    logger = setup_logging()
+    image_files = scan_images(image_folder, shard=shard, logger=logger,
+                              **(scan_options or {}))
+    model = load_model_safe(model_path, logger, backend, num_threads,
+                            (batch_size,), model_cache=model_cache)
+    cache = open_cache(model, logger) if use_cache else None
+    annotator = None
+    if annotate_options is not None:
+        annotator = AnnotationPool(logger, **annotate_options)
+
+    # Her süreç kendi günlük segmentine yazar, manifest ortaktır
+    result_log = ResultLog(Config.SONUC_GUNLUGU)
+    writer = BackgroundWriter(Config.YAZICI_KUYRUGU, logger=logger)
+    manifest = RunManifest(manifest_path)
+    try:
+        on_result = stream_results(result_log, manifest, batch_id, writer)
+        score_images(model, image_files, logger, on_result, batch_size,
+                     decode_workers, queue_depth, cache, annotator, manifest)
+    finally:
+        if annotator is not None:
+            annotator.close()
+        writer.close()
+        manifest.close()
+        result_log.close()
+
+
+def batch_process_sharded(image_folder, logger, workers, model_path,
+                          backend=Config.BACKEND,
+                          num_threads=Config.TFLITE_IS_PARCACIGI,
+                          batch_size=Config.BATCH_BOYUTU,
+                          decode_workers=Config.COZUCU_SAYISI,
+                          queue_depth=Config.KUYRUK_DERINLIGI, use_cache=True,
+                          annotate_options=None, resume=False,
+                          scan_options=None, model_cache=Config.MODEL_ONBELLEGI):
+    """Toplu işlemi her biri kendi modelini yükleyen süreçlere böl
+
+    annotate_options verilirse her süreç bu ayarlarla kendi
+    AnnotationPool'unu kurar. Dönen değer {tahmin: sayı} özetidir.
+    """
+    workers = max(1, workers)
+
+    # Dönüştürme gerekiyorsa bir kez burada yapılır; süreçler sıcak başlar
+    if uses_artifact(backend, model_path, model_cache):
+        artifact, convert_time = prepare_artifact(backend, model_path, model_cache)
+        if convert_time is not None:
+            logger.info(f"✓ Model dönüştürüldü: {artifact} ({convert_time:.3f} s)")
+
+    manifest, batch_id = open_manifest(image_folder, resume, logger)
+
+    # Çekirdekler süreçler arasında paylaştırılır, aşırı abonelik olmasın
+    # (TFLite'ta --tflite-threads, Keras'ta tüm çekirdekler paylaştırılır)
+    if backend == 'keras':
+        num_threads = os.cpu_count() or 1
+    num_threads = max(1, num_threads // workers)
+    decode_workers = max(1, decode_workers // workers)
+    if annotate_options is not None:
+        annotate_options = dict(annotate_options, workers=max(
+            1, annotate_options.get('workers', Config.ETIKET_ISCI) // workers))
+
+    logger.info(f"Toplu işlem başlıyor: {image_folder}, "
+                f"{workers} süreç (süreç başına {num_threads} çıkarım, "
+                f"{decode_workers} çözücü iş parçacığı)")
+
+    # Her süreç klasörü kendisi tarar ve yol özetine göre kendi dilimini alır
+    shards = [(i, workers) for i in range(workers)]
+
+    # TensorFlow fork ile güvenli değil, alt süreçler sıfırdan başlatılır
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(_shard_worker, image_folder, shard, scan_options,
+                                model_path, backend, num_threads, batch_size,
+                                decode_workers, queue_depth, use_cache,
+                                annotate_options, manifest.db_path, batch_id,
+                                model_cache)
+                for shard in shards
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        counts = manifest.counts()
+        manifest.close()
 
-    logger.info(f"✓ Toplu işlem tamamlandı: {batch_result_path}")
-    return results
+    logger.info(f"✓ Toplu işlem tamamlandı: {batch_id} "
+                f"({sum(counts.values())} sonuç, {Config.SONUC_GUNLUGU})")
+    return counts
 
 
 # ===============================
@@ -299,6 +1106,8 @@ def batch_process_images(model, image_folder, logger):
 
 def main():
     """Ana program döngüsü"""
+    profiler = StartupProfiler()
+    profiler.mark('Modül içe aktarma')
 
     # Argüman ayrıştırıcı
     parser = argparse.ArgumentParser(
@@ -310,52 +1119,220 @@ def main():
                         help='Toplu işlem için görüntü klasörü')
     parser.add_argument('--save-results', action='store_true',
                         help='Sonuçları kaydet')
+    parser.add_argument('--camera', type=str, default=Config.KAMERA_KAYNAGI,
+                        help=f"Kamera kaynağı: {', '.join(CAMERA_SOURCES)} "
+                             f"ya da görüntü dosyası/klasörü yolu")
+    parser.add_argument('--capture', choices=('jpeg', 'raw'), default=Config.CEKIM_BICIMI,
+                        help='Çekim biçimi: jpeg ya da raw (ham BGR, JPEG ve dosya G/Ç\'si yok)')
+    parser.add_argument('--continuous', action='store_true',
+                        help='Kamerayı açık tutup arka arkaya çekip sınıflandır')
+    parser.add_argument('--interval', type=float, default=Config.CEKIM_ARALIGI,
+                        help='Sürekli modda çekimler arası hedef süre, saniye (0 = beklemeden)')
+    parser.add_argument('--max-frames', type=int,
+                        help='Sürekli/video modunda bu kadar kareden sonra dur')
+    parser.add_argument('--video', type=str,
+                        help='Video dosyası, akış adresi ya da kamera aygıt numarası')
+    parser.add_argument('--frame-stride', type=int, default=Config.KARE_ADIMI,
+                        help='Videoda her kaç karede bir örnek alınacağı')
+    parser.add_argument('--change-threshold', type=float, default=Config.DEGISIM_ESIGI,
+                        help='Sahne değişimi eşiği; altındaki örneklerde çıkarım atlanır (0 = kapalı)')
+    parser.add_argument('--smoothing', type=float, default=Config.YUMUSATMA,
+                        help='Skor yumuşatma ağırlığı, 0-1 (1 = yumuşatma yok)')
     parser.add_argument('--model-path', type=str, default=Config.MODEL_YOLU,
                         help='Model dosya yolu')
+    parser.add_argument('--backend', choices=BACKENDS, default=Config.BACKEND,
+                        help='Çıkarım arka ucu (keras veya tflite)')
+    parser.add_argument('--tflite-threads', type=int,
+                        default=Config.TFLITE_IS_PARCACIGI,
+                        help='TFLite yorumlayıcı iş parçacığı sayısı')
+    parser.add_argument('--batch-size', type=int, default=Config.BATCH_BOYUTU,
+                        help='Toplu işlemde batch başına görüntü sayısı')
+    parser.add_argument('--decode-workers', type=int, default=Config.COZUCU_SAYISI,
+                        help='Toplu işlemde paralel görüntü çözücü sayısı')
+    parser.add_argument('--queue-depth', type=int, default=Config.KUYRUK_DERINLIGI,
+                        help='Aşamalar arası kuyruk kapasitesi')
+    parser.add_argument('--workers', type=int, default=Config.SUREC_SAYISI,
+                        help='Toplu işlemde paralel süreç sayısı (her biri kendi modelini yükler)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='İçerik özetli tahmin önbelleğini kullanma')
+    parser.add_argument('--model-cache', type=str, default=Config.MODEL_ONBELLEGI,
+                        help='Dönüştürülmüş model klasörü (boş = .h5\'i her seferinde yükle)')
+    parser.add_argument('--recursive', action='store_true',
+                        help='Toplu işlemde alt klasörleri de tara')
+    parser.add_argument('--include', action='append', default=[],
+                        help='Yalnızca bu desene uyan dosyalar (ör. "sera1/*"), tekrarlanabilir')
+    parser.add_argument('--exclude', action='append', default=[],
+                        help='Bu desene uyan dosyaları atla, tekrarlanabilir')
+    parser.add_argument('--min-size-kb', type=int, default=0,
+                        help='Bu boyuttan küçük dosyaları atla (KB)')
+    parser.add_argument('--max-size-kb', type=int,
+                        help='Bu boyuttan büyük dosyaları atla (KB)')
+    parser.add_argument('--newer-than', type=datetime.fromisoformat,
+                        help='Yalnızca bu tarihten sonra değişen dosyalar (ör. 2026-05-01)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Yarıda kalan toplu işleme kaldığı yerden devam et')
+    parser.add_argument('--annotate', action='store_true',
+                        help='Toplu işlemde etiketli görüntüler de üret')
+    parser.add_argument('--annotate-quality', type=int, default=Config.ETIKET_KALITESI,
+                        help='Etiketli görüntülerin JPEG kalitesi (1-100)')
+    parser.add_argument('--annotate-max-side', type=int, default=Config.ETIKET_MAKS_KENAR,
+                        help='Etiketli görüntü uzun kenarı, piksel (0 = orijinal boyut)')
+    parser.add_argument('--annotate-workers', type=int, default=Config.ETIKET_ISCI,
+                        help='Etiketleme iş parçacığı sayısı')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='İçe aktarma ve model yükleme sürelerini yazdır')
 
     args = parser.parse_args()
+    profiler.mark('Argümanlar')
 
     # Kurulum
     logger = setup_logging()
     create_directories()
+    result_log = ResultLog(Config.SONUC_GUNLUGU)
+
+    # Sonuç ve etiketli görüntü yazımı çıkarımı bekletmesin
+    writer = BackgroundWriter(Config.YAZICI_KUYRUGU, logger=logger)
+    profiler.mark('Kurulum')
 
     logger.info("=" * 60)
     logger.info("Bitki Hastalığı Tespit Sistemi v2.0 Başlatılıyor...")
     logger.info("=" * 60)
 
     try:
-        # Model yükle
-        model = load_model_safe(args.model_path, logger)
+        sharded = args.batch and args.input_folder and args.workers > 1
+
+        # Model yükle (çok süreçli modda her alt süreç kendi modelini yükler)
+        if not sharded:
+            warmup_sizes = (max(1, args.batch_size),) if args.batch else (1,)
+            # Tek süreçte Keras tüm çekirdekleri kullanır
+            num_threads = args.tflite_threads if args.backend == 'tflite' else None
+            model = load_model_safe(args.model_path, logger, args.backend,
+                                    num_threads, warmup_sizes,
+                                    profiler if args.profile_startup else None,
+                                    args.model_cache or None)
+            cache = None if args.no_cache else open_cache(model, logger)
+            profiler.mark('Önbellek')
+
+        if args.profile_startup:
+            profiler.report()
+
+        scan_options = {
+            'recursive': args.recursive,
+            'include': args.include,
+            'exclude': args.exclude,
+            'min_size': args.min_size_kb * 1024,
+            'max_size': args.max_size_kb * 1024 if args.max_size_kb else None,
+            'newer_than': args.newer_than.timestamp() if args.newer_than else None
+        }
+
+        annotate_options = None
+        if args.batch and args.annotate:
+            annotate_options = {
+                'workers': max(1, args.annotate_workers),
+                'quality': args.annotate_quality,
+                'max_side': max(0, args.annotate_max_side),
+                'max_pending': max(1, args.queue_depth)
+            }
 
         # Toplu işlem modu
         if args.batch and args.input_folder:
-            results = batch_process_images(model, args.input_folder, logger)
+            if sharded:
+                counts = batch_process_sharded(args.input_folder, logger,
+                                               args.workers, args.model_path,
+                                               args.backend, args.tflite_threads,
+                                               max(1, args.batch_size),
+                                               max(1, args.decode_workers),
+                                               max(1, args.queue_depth),
+                                               not args.no_cache,
+                                               annotate_options, args.resume,
+                                               scan_options, args.model_cache or None)
+            else:
+                annotator = None
+                if annotate_options is not None:
+                    annotator = AnnotationPool(logger, **annotate_options)
+                try:
+                    counts = batch_process_images(model, args.input_folder, logger,
+                                                  result_log,
+                                                  max(1, args.batch_size),
+                                                  max(1, args.decode_workers),
+                                                  max(1, args.queue_depth), cache,
+                                                  writer, annotator, args.resume,
+                                                  scan_options)
+                finally:
+                    if annotator is not None:
+                        annotator.close()
 
             # Özet istatistikler
             print(f"\n📊 TOPLU İŞLEM ÖZETİ:")
-            print(f"  Toplam: {len(results)}")
+            print(f"  Toplam: {sum(counts.values())}")
             for label in Config.ETIKETLER:
-                count = sum(1 for r in results if r['prediction'] == label)
-                print(f"  {label}: {count}")
+                print(f"  {label}: {counts.get(label, 0)}")
+
+        # Video modu
+        elif args.video:
+            timeline_log = ResultLog(Config.ZAMAN_CIZELGESI, prefix='timeline')
+            try:
+                counts = run_video(model, args.video, logger, timeline_log,
+                                   max(1, args.frame_stride),
+                                   max(0.0, args.change_threshold),
+                                   min(1.0, max(0.01, args.smoothing)),
+                                   args.max_frames)
+            finally:
+                timeline_log.close()
+
+            print(f"\n🎞️  VİDEO ÖZETİ:")
+            print(f"  Kare: {counts['frames']}, örnek: {counts['sampled']}, "
+                  f"çıkarım: {counts['inferences']}, bölüm: {counts['segments']}")
+            print(f"  Zaman çizelgesi: {Config.ZAMAN_CIZELGESI}")
+
+        # Sürekli çekim modu
+        elif args.continuous:
+            with open_camera_safe(args.camera, logger) as camera:
+                run_continuous(model, camera, logger, max(0.0, args.interval),
+                               writer if args.save_results else None,
+                               result_log, args.max_frames, args.capture == 'raw')
+
+        # Ham kare ile tekli işlem (dosya G/Ç'si yok)
+        elif args.capture == 'raw':
+            from preprocessing import Preprocessor
+            with open_camera_safe(args.camera, logger) as camera:
+                original, boyutlanmis = capture_raw(camera, Config.HEDEF_BOYUT,
+                                                    args.save_results)
+
+            islenmis = Preprocessor(Config.HEDEF_BOYUT).batch([boyutlanmis])
+            # Ham sensör karesi tekrarlanmaz, önbellek kullanılmaz
+            result = predict_disease(model, islenmis, logger)
+
+            print_detailed_result(result)
+
+            # Kare yalnızca istenirse, arka planda JPEG'e kodlanır
+            if args.save_results:
+                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                foto_yolu = f"{Config.GORUNTU_KLASORU}/capture_{timestamp}.jpg"
+                writer.submit(save_frame, original, foto_yolu)
+                writer.submit(save_results, result, original, logger, result_log)
 
         # Tekli işlem modu
         else:
             # Görüntü yakala
-            foto_yolu = capture_image_safe(Config.KAMERA_COZUNURLUK, logger)
+            with open_camera_safe(args.camera, logger) as camera:
+                foto_yolu, data = capture_image_safe(camera, logger)
 
-            # Görüntü işle
-            original, islenmis = preprocess_image(foto_yolu,
-                                                  Config.HEDEF_BOYUT, logger)
+            # Görüntü işle (bellekteki JPEG baytlarından)
+            _, islenmis = preprocess_image(foto_yolu, Config.HEDEF_BOYUT, logger,
+                                           data=data)
 
             # Tahmin yap
-            result = predict_disease(model, islenmis, logger)
+            digest = content_digest(data) if cache else None
+            result = predict_disease(model, islenmis, logger, cache, digest)
 
             # Sonuçları göster
             print_detailed_result(result)
 
-            # Sonuçları kaydet
+            # Sonuçları kaydet (etiketli kare aynı baytlardan, tam çözünürlükte
+            # arka plan yazıcısında çözülür)
             if args.save_results:
-                save_results(result, foto_yolu, logger)
+                writer.submit(save_results, result, data, logger, result_log)
 
         logger.info("✓ İşlem başarıyla tamamlandı!")
 
@@ -367,6 +1344,11 @@ def main():
         raise
 
     finally:
+        # Ctrl+C dahil her durumda bekleyen yazma işleri diske aktarılır
+        if writer.depth:
+            logger.info(f"Bekleyen {writer.depth} yazma işi tamamlanıyor...")
+        writer.close()
+        result_log.close()
         logger.info("Program sonlandırılıyor...")
 
 
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tahmin Önbelleği / Prediction Cache
+Görüntü baytlarının içerik özeti + model kimliği ile anahtarlanır.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from storage import connect_sqlite
+
+
+def content_digest(data):
+    """Görüntü baytlarının SHA-256 özeti"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Dosyanın SHA-256 özeti (parça parça okunur)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_identity(backend):
+    """Arka uç adı + model dosyası özeti; model değişince anahtar da değişir"""
+    return f"{backend.name}:{file_digest(backend.model_path)}"
+
+
+class PredictionCache:
+    """Sınırlı bellek içi LRU katmanı ve isteğe bağlı SQLite disk katmanı
+
+    Disk katmanı açılırken başka bir model kimliğine ait kayıtlar silinir,
+    böylece model dosyası değiştiğinde önbellek kendiliğinden geçersizleşir.
+    """
+
+    def __init__(self, model_id, capacity=1024, db_path=None):
+        self.model_id = model_id
+        self.capacity = capacity
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = connect_sqlite(db_path)
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS predictions ('
+                'model_id TEXT NOT NULL, digest TEXT NOT NULL, '
+                'scores TEXT NOT NULL, PRIMARY KEY (model_id, digest))'
+            )
+            self._db.execute('DELETE FROM predictions WHERE model_id != ?',
+                             (model_id,))
+            self._db.commit()
+
+    def get(self, digest):
+        """Önbellekteki skor listesini döndür, yoksa None"""
+        with self._lock:
+            scores = self._memory.get(digest)
+            if scores is not None:
+                self._memory.move_to_end(digest)
+                return scores
+
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                'SELECT scores FROM predictions WHERE model_id = ? AND digest = ?',
+                (self.model_id, digest)
+            ).fetchone()
+            if row is None:
+                return None
+
+            scores = json.loads(row[0])
+            self._remember(digest, scores)
+            return scores
+
+    def put(self, digest, scores, writer=None):
+        """Skorları her iki katmana yaz"""
+        self.put_many([(digest, scores)], writer)
+
+    def put_many(self, items, writer=None):
+        """(özet, skorlar) çiftlerini bellek katmanına hemen, disk katmanına
+        tek commit ile yaz
+
+        writer (BackgroundWriter) verilirse disk yazımı arka planda yapılır
+        ve commit yazıcının toplu işi başına bir kez çağrılır.
+        """
+        rows = []
+        with self._lock:
+            for digest, scores in items:
+                scores = [float(s) for s in scores]
+                self._remember(digest, scores)
+                rows.append((self.model_id, digest, json.dumps(scores)))
+
+        if self._db is None or not rows:
+            return
+        if writer is not None:
+            writer.submit(self._store, rows, flush=self.commit)
+        else:
+            self._store(rows)
+            self.commit()
+
+    def _store(self, rows):
+        with self._lock:
+            if self._db is not None:
+                self._db.executemany(
+                    'INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)', rows
+                )
+
+    def commit(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+
+    def _remember(self, digest, scores):
+        self._memory[digest] = scores
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.commit()
+                self._db.close()
+                self._db = None
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Kamera Oturumları / Camera Sessions
+Sensörü açık tutan uzun ömürlü kamera oturumu ile Pi kamerası olmayan
+makinelerde test ve ölçüm için dosya ve sentetik yedekler.
+picamera ve OpenCV yalnızca onları kullanan oturum açıldığında yüklenir.
+"""
+
+import io
+import itertools
+import os
+import time
+
+import numpy as np
+
+
+CAMERA_SOURCES = ('pi', 'synthetic')  # ya da bir dosya/klasör yolu
+
+
+class CameraSession:
+    """Kamera oturumu temel sınıfı
+
+    capture() her çağrıda bir karenin JPEG baytlarını bellekte döndürür,
+    capture_array() ise ham BGR kareyi yeniden kullanılan bir diziye yazar;
+    oturum close() çağrılana kadar açık kalır.
+    """
+    name = 'base'
+
+    def __init__(self, resolution):
+        self.resolution = tuple(resolution)
+        self.frames = 0
+
+    def capture(self):
+        """Bir kare yakala, JPEG baytlarını döndür"""
+        raise NotImplementedError
+
+    def capture_array(self, size=None):
+        """Bir kare yakala, BGR uint8 dizi döndür; size=(genişlik, yükseklik)
+        verilirse kare o boyutta döner. Dizi sonraki çağrıda üzerine
+        yazılabilir, saklanacaksa kopyalanmalıdır."""
+        import cv2
+        frame = cv2.imdecode(np.frombuffer(self.capture(), dtype=np.uint8),
+                             cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError('Kare çözülemedi')
+        if size is not None and frame.shape[1::-1] != tuple(size):
+            frame = cv2.resize(frame, tuple(size))
+        return frame
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PiCameraSession(CameraSession):
+    """Açık tutulan PiCamera; ısınma yalnızca oturum açılırken beklenir"""
+    name = 'pi'
+
+    def __init__(self, resolution, warmup=2.0):
+        super().__init__(resolution)
+        from picamera import PiCamera
+        self.camera = PiCamera()
+        try:
+            self.camera.resolution = self.resolution
+            time.sleep(warmup)  # Pozlama ve beyaz dengesi otururken bekle
+        except Exception:
+            self.camera.close()
+            raise
+        self._stream = io.BytesIO()
+        self._buffer = None
+        self._buffer_shape = None
+
+    def capture(self):
+        # Video portu sensörü yeniden yapılandırmadan kare verir; fotoğraf
+        # portuna göre arka arkaya çekimde çok daha hızlıdır.
+        self._stream.seek(0)
+        self._stream.truncate()
+        self.camera.capture(self._stream, format='jpeg', use_video_port=True)
+        self.frames += 1
+        return self._stream.getvalue()
+
+    def capture_array(self, size=None):
+        # Küçültme kameranın GPU'sunda (resize) yapılır ve ham BGR doğrudan
+        # numpy tamponuna yazılır: JPEG kodlama/çözme ve dosya G/Ç'si yok.
+        width, height = size or self.resolution
+        # GPU çıktısı genişlikte 32, yükseklikte 16 piksele hizalanır
+        shape = ((height + 15) // 16 * 16, (width + 31) // 32 * 32, 3)
+        if self._buffer_shape != shape:
+            self._buffer = np.empty(shape, dtype=np.uint8)
+            self._buffer_shape = shape
+        self.camera.capture(self._buffer, format='bgr', use_video_port=True,
+                            resize=tuple(size) if size else None)
+        self.frames += 1
+        return self._buffer[:height, :width]
+
+    def close(self):
+        self.camera.close()
+
+
+class FileCameraSession(CameraSession):
+    """Dosya veya klasördeki görüntüleri sırayla (döngüsel) veren kamera yedeği"""
+    name = 'file'
+
+    def __init__(self, path, resolution, loop=True):
+        super().__init__(resolution)
+        from preprocessing import IMAGE_EXTENSIONS
+        if os.path.isdir(path):
+            files = sorted(
+                entry.path for entry in os.scandir(path)
+                if entry.is_file()
+                and entry.name.rsplit('.', 1)[-1].lower() in IMAGE_EXTENSIONS
+            )
+        else:
+            files = [path]
+        if not files or not os.path.exists(files[0]):
+            raise FileNotFoundError(f"Kamera kaynağında görüntü bulunamadı: {path}")
+
+        self._files = itertools.cycle(files) if loop else iter(files)
+
+    def capture(self):
+        try:
+            path = next(self._files)
+        except StopIteration:
+            raise EOFError('Kamera kaynağındaki görüntüler bitti') from None
+        with open(path, 'rb') as f:
+            data = f.read()
+        self.frames += 1
+        return data
+
+
+class SyntheticCameraSession(CameraSession):
+    """Her çağrıda farklı, rastgele bir kare üreten kamera yedeği"""
+    name = 'synthetic'
+
+    def __init__(self, resolution, seed=0, quality=90):
+        super().__init__(resolution)
+        self._rng = np.random.default_rng(seed)
+        self._quality = quality
+        self._buffers = {}
+
+    def _render(self, size):
+        # Düşük çözünürlüklü gürültüyü büyütmek gerçek kareye daha yakın
+        # (ve JPEG'i daha ucuz) bir içerik verir
+        width, height = self.resolution
+        import cv2
+        noise = self._rng.integers(0, 256, (height // 16, width // 16, 3),
+                                   dtype=np.uint8)
+        size = tuple(size or self.resolution)
+        buffer = self._buffers.get(size)
+        if buffer is None:
+            buffer = self._buffers[size] = np.empty((size[1], size[0], 3),
+                                                    dtype=np.uint8)
+        cv2.resize(noise, size, dst=buffer, interpolation=cv2.INTER_LINEAR)
+        self.frames += 1
+        return buffer
+
+    def capture(self):
+        import cv2
+        ok, encoded = cv2.imencode('.jpg', self._render(None),
+                                   [cv2.IMWRITE_JPEG_QUALITY, self._quality])
+        if not ok:
+            raise ValueError('Sentetik kare kodlanamadı')
+        return encoded.tobytes()
+
+    def capture_array(self, size=None):
+        return self._render(size)
+
+
+def open_camera(source, resolution, warmup=2.0):
+    """'pi', 'synthetic' ya da dosya/klasör yolu için kamera oturumu aç"""
+    if source == 'pi':
+        return PiCameraSession(resolution, warmup)
+    if source == 'synthetic':
+        return SyntheticCameraSession(resolution)
+    return FileCameraSession(source, resolution)
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Çıkarım Arka Uçları / Inference Backends
+YZDBHTS.py ve web_dashboard.py tarafından ortak kullanılır.
+"""
+
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from pathlib import Path
+
+import numpy as np
+
+from cache import file_digest
+
+
+BACKENDS = ('keras', 'tflite')
+INPUT_SHAPE = (224, 224, 3)
+
+# Arka uca göre dönüştürülmüş model biçimi (model önbelleğinde)
+ARTIFACT_KINDS = {'keras': 'savedmodel', 'tflite': 'tflite'}
+
+
+# ===============================
+# BACKENDS / ARKA UÇLAR
+# ===============================
+
+class InferenceBackend:
+    """Çıkarım arka ucu temel sınıfı"""
+    name = 'base'
+    load_info = None
+    # True ise her yeni batch boyutu bir ayırma maliyeti getirir; mikro
+    # batch'ler birkaç sabit boyuta doldurulur
+    fixed_shapes = False
+
+    def __init__(self, model_path):
+        self.model_path = str(model_path)
+
+    def predict(self, batch):
+        """(N, 224, 224, 3) girdi için (N, sınıf sayısı) skor dizisi döndür"""
+        raise NotImplementedError
+
+    def warmup(self, batch_sizes=(1,)):
+        """Verilen batch boyutlarında sahte girdiyle çalıştır, süreyi döndür"""
+        start = time.perf_counter()
+        for size in sorted(set(batch_sizes)):
+            self.predict(np.zeros((size,) + INPUT_SHAPE, dtype=np.float32))
+        return time.perf_counter() - start
+
+
+class KerasBackend(InferenceBackend):
+    """tf.keras .h5 modeli, sabit imzalı derlenmiş çağrı ile
+
+    saved_model_path verilirse .h5 yerine önceden dışa aktarılmış SavedModel
+    yüklenir; Keras katmanları yeniden kurulmadığı için belirgin biçimde
+    daha hızlıdır. model_path her durumda kaynak .h5 dosyasıdır.
+    num_threads verilirse TensorFlow'un iş parçacığı havuzları bu sayıyla
+    sınırlanır (aynı makinede birden fazla süreç çalışırken).
+    """
+    name = 'keras'
+
+    def __init__(self, model_path, saved_model_path=None, num_threads=None):
+        super().__init__(model_path)
+        import tensorflow as tf
+        self._tf = tf
+        if num_threads:
+            self._limit_threads(tf, num_threads)
+        if saved_model_path:
+            self.model = tf.saved_model.load(str(saved_model_path))
+            self._fn = self.model.serve
+            return
+
+        self.model = tf.keras.models.load_model(self.model_path, compile=False)
+
+        # model.predict her çağrıda veri hattı kurar; sabit imzalı tf.function
+        # yalnızca bir kez izlenir ve tekil görüntülerde çok daha hızlıdır.
+        self._fn = _serving_function(tf, self.model)
+
+    @staticmethod
+    def _limit_threads(tf, num_threads):
+        # Havuzlar yalnızca çalışma zamanı başlamadan ayarlanabilir; bu süreçte
+        # TensorFlow zaten kullanıldıysa (ör. dönüştürme) varsayılanlar kalır
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            # Tek model, tek akış: işlemler arası paralellik için 2 yeter
+            tf.config.threading.set_inter_op_parallelism_threads(min(2, num_threads))
+        except RuntimeError:
+            pass
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        return self._fn(self._tf.constant(batch)).numpy()
+
+
+class TFLiteBackend(InferenceBackend):
+    """TFLite yorumlayıcısı (XNNPACK, ayarlanabilir iş parçacığı sayısı)
+
+    Her batch boyutu için ayrı bir yorumlayıcı tutulur; boyutlar arasında
+    gidip gelmek tensörleri yeniden ayırmaz. Model dosyası bellek eşlemeli
+    okunur, ancak XNNPACK ağırlıkları her yorumlayıcıda ayrıca paketler;
+    bu yüzden yalnızca birkaç boyut kullanılmalıdır.
+    """
+    name = 'tflite'
+    fixed_shapes = True
+
+    def __init__(self, model_path, num_threads=None):
+        super().__init__(model_path)
+        self._Interpreter = _import_interpreter()
+        # tflite-runtime >= 2.5 float modellerde XNNPACK delegesini
+        # varsayılan olarak uygular; num_threads onun iş parçacığı sayısıdır.
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self._interpreters = {}  # batch boyutu -> (yorumlayıcı, girdi, çıktı)
+        self._interpreter(1)
+
+    def _interpreter(self, batch_size):
+        """batch_size için ayrılmış yorumlayıcıyı döndür, yoksa oluştur"""
+        entry = self._interpreters.get(batch_size)
+        if entry is None:
+            interpreter = self._Interpreter(model_path=self.model_path,
+                                            num_threads=self.num_threads)
+            details = interpreter.get_input_details()[0]
+            if details['shape'][0] != batch_size:
+                interpreter.resize_tensor_input(details['index'],
+                                                [batch_size, *INPUT_SHAPE])
+            interpreter.allocate_tensors()
+            entry = self._interpreters[batch_size] = (
+                interpreter,
+                interpreter.get_input_details()[0],
+                interpreter.get_output_details()[0]
+            )
+        return entry
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        interpreter, input_details, output_details = self._interpreter(len(batch))
+
+        scale, zero_point = input_details['quantization']
+        if input_details['dtype'] != np.float32 and scale:
+            batch = np.round(batch / scale + zero_point).astype(input_details['dtype'])
+
+        interpreter.set_tensor(input_details['index'], batch)
+        interpreter.invoke()
+        output = interpreter.get_tensor(output_details['index'])
+
+        scale, zero_point = output_details['quantization']
+        if output_details['dtype'] != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return np.array(output, copy=True)
+
+
+# ===============================
+# MICRO-BATCHING / MİKRO BATCH
+# ===============================
+
+def batch_buckets(max_batch_size):
+    """Mikro batch'lerin çalıştığı boyutlar: tekil istek ve tam batch
+
+    Isındırma da bu boyutlarda yapılmalıdır.
+    """
+    return tuple(sorted({1, max(1, max_batch_size)}))
+
+
+class MicroBatcher:
+    """Eşzamanlı tekil istekleri kısa bir süre bekletip tek batch'te çalıştırır
+
+    İlk istek geldikten sonra en fazla max_wait saniye ya da max_batch_size
+    istek dolana kadar beklenir; sonuçlar bekleyen isteklere dağıtılır.
+    max_queue > 0 ise kuyrukta en fazla o kadar görüntü bekler, fazlası
+    beklemeden reddedilir (0 = sınırsız). Sabit şekilli arka uçlarda
+    (TFLite) batch'ler batch_sizes'taki en küçük uygun boyuta doldurulur;
+    Keras'ta dolgu yapılmaz, tek istek tek satırlık çağrıyla çalışır.
+    """
+
+    def __init__(self, backend, preprocessor, max_batch_size=8, max_wait=0.005,
+                 max_queue=0):
+        self.backend = backend
+        self.preprocessor = preprocessor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.batch_sizes = batch_buckets(max_batch_size)
+        self._pad = getattr(backend, 'fixed_shapes', False)
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Sayaçları yalnızca batcher iş parçacığı yazar
+        self.completed = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.batch_time = 0.0  # Batch süresinin üstel ortalaması (s)
+        self._thread = threading.Thread(target=self._run, name='micro-batcher',
+                                        daemon=True)
+        self._thread.start()
+
+    @property
+    def depth(self):
+        """Kuyrukta bekleyen görüntü sayısı"""
+        return self._queue.qsize()
+
+    def full(self):
+        return self.max_queue > 0 and self.depth >= self.max_queue
+
+    def drain_time(self):
+        """Şu an kuyrukta bekleyenlerin işlenmesi için tahmini süre (s)"""
+        batches = -(-self.depth // self.max_batch_size) + 1
+        return batches * self.batch_time
+
+    def stats(self):
+        """Kuyruk derinliği ve bekleme süresi sayaçları"""
+        completed = self.completed
+        return {
+            'queue_depth': self.depth,
+            'queue_limit': self.max_queue,
+            'completed': completed,
+            'queue_wait_avg_ms': round(self.queue_wait_total / completed * 1000, 2) if completed else 0.0,
+            'queue_wait_max_ms': round(self.queue_wait_max * 1000, 2),
+            'batch_time_ms': round(self.batch_time * 1000, 2)
+        }
+
+    def enqueue(self, resized_image):
+        """Görüntüyü beklemeden kuyruğa ekle; (skorlar, zamanlama) veren
+        Future döndür (asyncio tarafında asyncio.wrap_future ile beklenir).
+        Kuyruk doluysa queue.Full yükseltilir."""
+        future = Future()
+        self._queue.put_nowait((resized_image, future, time.perf_counter()))
+        return future
+
+    def submit(self, resized_image):
+        """Boyutlandırılmış (224, 224, 3) uint8 görüntüyü kuyruğa ekle,
+        (skorlar, zamanlama) döndür"""
+        return self.enqueue(resized_image).result()
+
+    def _collect(self):
+        # İptal edilmiş Future'lar (ör. asyncio tarafında iptal edilen istek)
+        # batch'e alınmaz; alınanlar RUNNING durumuna geçer ve artık iptal
+        # edilemez
+        while True:
+            first = self._queue.get()
+            if first[1].set_running_or_notify_cancel():
+                break
+        items = [first]
+        deadline = first[2] + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item[1].set_running_or_notify_cancel():
+                items.append(item)
+        return items
+
+    def _pad_size(self, count):
+        if not self._pad:
+            return None
+        return min(size for size in self.batch_sizes if size >= count)
+
+    @staticmethod
+    def _resolve(future, result=None, error=None):
+        """Future'ı sonuçlandır; tek bir bozuk bekleyen döngüyü durdurmasın"""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            start = time.perf_counter()
+            try:
+                batch = self.preprocessor.batch([x for x, _, _ in items],
+                                                pad_to=self._pad_size(len(items)))
+                scores = self.backend.predict(batch)
+            except Exception as e:
+                for _, future, _ in items:
+                    self._resolve(future, error=e)
+                continue
+            inference_time = time.perf_counter() - start
+
+            waits = [start - enqueued for _, _, enqueued in items]
+            self.completed += len(items)
+            self.queue_wait_total += sum(waits)
+            self.queue_wait_max = max(self.queue_wait_max, max(waits))
+            if self.batch_time:
+                self.batch_time += 0.2 * (inference_time - self.batch_time)
+            else:
+                self.batch_time = inference_time
+
+            for (_, future, enqueued), row in zip(items, scores):
+                self._resolve(future, (row, {
+                    'batch_size': len(items),
+                    'queue_wait': start - enqueued,
+                    'inference_time': inference_time
+                }))
+
+
+# ===============================
+# MODEL ARTIFACT CACHE / DÖNÜŞTÜRÜLMÜŞ MODEL ÖNBELLEĞİ
+# ===============================
+
+def _serving_function(tf, model):
+    return tf.function(
+        lambda x: model(x, training=False),
+        input_signature=[tf.TensorSpec((None,) + INPUT_SHAPE, tf.float32)]
+    )
+
+
+def _export_savedmodel(model_path, output_path):
+    import tensorflow as tf
+    model = tf.keras.models.load_model(str(model_path), compile=False)
+    module = tf.Module()
+    module.model = model
+    module.serve = _serving_function(tf, model)
+    tf.saved_model.save(module, str(output_path))
+
+
+def _export_tflite(model_path, output_path):
+    import tensorflow as tf
+    model = tf.keras.models.load_model(str(model_path), compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    Path(output_path).write_bytes(converter.convert())
+
+
+_EXPORTERS = {'savedmodel': _export_savedmodel, 'tflite': _export_tflite}
+
+
+def prepare_artifact(name, model_path, cache_dir):
+    """Kaynak modelin arka uca uygun dönüştürülmüş kopyasını hazırla
+
+    Önbellekteki dosya adı kaynak dosyanın SHA-256 özetini içerir; model
+    değişince yeniden dönüştürülür, aynı kaynağın eski kopyaları silinir.
+    (artifact yolu, dönüştürme süresi ya da önbellekten geldiyse None)
+    döndürür. Dönüştürme yalnızca ilk seferde TensorFlow gerektirir.
+    """
+    kind = ARTIFACT_KINDS[name]
+    source = Path(model_path)
+    cache_dir = Path(cache_dir)
+    artifact = cache_dir / f"{source.stem}-{file_digest(source)[:16]}.{kind}"
+    if artifact.exists():
+        return str(artifact), None
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    # Önce geçici ada yazılır; yarım kalan dönüştürme önbellekte görünmez
+    partial = cache_dir / f".{artifact.name}.{os.getpid()}.tmp"
+    try:
+        _EXPORTERS[kind](source, partial)
+        os.replace(partial, artifact)
+    except OSError:
+        # Aynı anda dönüştüren başka bir süreç önce bitirdiyse onunki kullanılır
+        if not artifact.exists():
+            raise
+    finally:
+        if partial.is_dir():
+            shutil.rmtree(partial, ignore_errors=True)
+        elif partial.exists():
+            partial.unlink()
+
+    # Yalnızca tam olarak {kök}-{16 onaltılık}.{tür} adları bu kaynağa aittir;
+    # adı aynı kökle başlayan başka modellerin (ör. plant-v2) kopyaları kalır
+    own = re.compile(re.escape(source.stem) + r'-[0-9a-f]{16}\.' + re.escape(kind))
+    for stale in cache_dir.glob(f"{source.stem}-*.{kind}"):
+        if stale == artifact or not own.fullmatch(stale.name):
+            continue
+        if stale.is_dir():
+            shutil.rmtree(stale, ignore_errors=True)
+        else:
+            stale.unlink()
+
+    return str(artifact), time.perf_counter() - start
+
+
+# ===============================
+# HELPER FUNCTIONS / YARDIMCI FONKSİYONLAR
+# ===============================
+
+def _import_interpreter():
+    """tflite-runtime yoksa tam TensorFlow içindeki yorumlayıcıya düş"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+def import_runtime(name):
+    """Arka ucun kütüphanesini içe aktar (başlangıç süresini ayrı ölçmek için)"""
+    if name == 'keras':
+        import tensorflow
+        return tensorflow
+    if name == 'tflite':
+        return _import_interpreter()
+    raise ValueError(f"Bilinmeyen arka uç: {name} (seçenekler: {', '.join(BACKENDS)})")
+
+
+def resolve_tflite_path(model_path):
+    """.h5 yolu verilirse yanındaki .tflite dosyasını kullan"""
+    path = Path(model_path)
+    if path.suffix != '.tflite':
+        path = path.with_suffix('.tflite')
+    if not path.exists():
+        raise FileNotFoundError(f"TFLite model dosyası bulunamadı: {path}")
+    return str(path)
+
+
+def uses_artifact(name, model_path, cache_dir):
+    """load_backend bu ayarlarla dönüştürülmüş model önbelleğini kullanır mı"""
+    if not cache_dir or Path(model_path).suffix != '.h5':
+        return False
+    # Elle üretilmiş komşu .tflite dosyası varsa o tercih edilir
+    return name == 'keras' or not Path(model_path).with_suffix('.tflite').exists()
+
+
+def load_backend(name, model_path, num_threads=None, cache_dir=None):
+    """İsme göre çıkarım arka ucunu oluştur
+
+    num_threads çıkarım iş parçacığı sayısıdır (None = çalışma zamanının
+    varsayılanı; Keras'ta tüm çekirdekler).
+
+    cache_dir verilirse .h5 modeli bir kez hızlı yüklenen biçime dönüştürülüp
+    orada saklanır (keras: SavedModel, tflite: bellek eşlemeli flatbuffer).
+    Yükleme bilgisi backend.load_info sözlüğüne yazılır.
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Bilinmeyen arka uç: {name} (seçenekler: {', '.join(BACKENDS)})")
+
+    artifact = convert_time = None
+    if uses_artifact(name, model_path, cache_dir):
+        artifact, convert_time = prepare_artifact(name, model_path, cache_dir)
+
+    start = time.perf_counter()
+    if name == 'keras':
+        backend = KerasBackend(model_path, artifact, num_threads)
+    else:
+        backend = TFLiteBackend(artifact or resolve_tflite_path(model_path),
+                                num_threads)
+
+    backend.load_info = {
+        'artifact': artifact,
+        'cached': artifact is not None and convert_time is None,
+        'convert_time': convert_time,
+        'load_time': time.perf_counter() - start
+    }
+    return backend
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Görüntü Ön İşleme / Image Preprocessing
+YZDBHTS.py ve web_dashboard.py aynı Preprocessor'ı kullanır, böylece
+modele giden girdiler iki tarafta da bit düzeyinde aynıdır.
+"""
+
+import io
+
+import cv2
+import numpy as np
+
+
+# Desteklenen görüntü uzantıları (CLI tarayıcısı ve web yüklemeleri için ortak)
+IMAGE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
+
+# Büyükten küçüğe: DCT alanında 1/8, 1/4, 1/2 ölçekli JPEG çözme
+REDUCED_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Bağımsız (uzunluk alanı olmayan) JPEG işaretçileri
+_STANDALONE_MARKERS = {0x01, 0xD8} | set(range(0xD0, 0xD8))
+
+# Boyut bilgisi taşıyan SOFn işaretçileri (DHT/JPG/DAC hariç)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+class Preprocessor:
+    """Yeniden kullanılan float32 batch tamponlarıyla ön işleme
+
+    resize() iş parçacığı güvenlidir ve uint8 çıktı üretir; batch() ise
+    tamponu yeniden kullandığı için tek bir tüketici iş parçacığından
+    çağrılmalı ve dönen dizi bir sonraki çağrıdan önce tüketilmelidir.
+    """
+
+    def __init__(self, target_size=(224, 224), batch_size=1):
+        self.target_size = tuple(target_size)
+        self._batch = self._allocate(batch_size)
+
+    def _allocate(self, batch_size):
+        width, height = self.target_size
+        return np.zeros((batch_size, height, width, 3), dtype=np.float32)
+
+    def resize(self, image):
+        """Çözülmüş BGR görüntüyü hedef boyuta getir (uint8)"""
+        return cv2.resize(image, self.target_size)
+
+    def batch(self, resized_images, pad_to=None):
+        """Boyutlandırılmış görüntüleri tampona yaz ve tek adımda normalize et
+
+        MobileNetV2 için [-1, 1] aralığı: x / 127.5 - 1, float32 olarak.
+        pad_to verilirse kalan satırlar sıfırla doldurulur.
+        """
+        count = len(resized_images)
+        size = max(count, pad_to or 0)
+        if size > len(self._batch):
+            self._batch = self._allocate(size)
+
+        batch = self._batch[:size]
+        for i, image in enumerate(resized_images):
+            batch[i] = image
+
+        active = batch[:count]
+        np.divide(active, np.float32(127.5), out=active)
+        np.subtract(active, np.float32(1.0), out=active)
+        batch[count:] = 0.0
+        return batch
+
+    def preprocess(self, image):
+        """Tek görüntü için (1, H, W, 3) float32 girdi döndür"""
+        return self.batch([self.resize(image)])
+
+
+# ===============================
+# REDUCED DECODE / KÜÇÜLTÜLMÜŞ ÇÖZME
+# ===============================
+
+def jpeg_size(f):
+    """JPEG başlığından (genişlik, yükseklik) oku; JPEG değilse None"""
+    if f.read(2) != b'\xff\xd8':
+        return None
+
+    while True:
+        byte = f.read(1)
+        while byte and byte != b'\xff':
+            byte = f.read(1)
+        while byte == b'\xff':
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker in _STANDALONE_MARKERS:
+            continue
+
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+
+        if marker in _SOF_MARKERS:
+            header = f.read(5)
+            if len(header) < 5:
+                return None
+            height = int.from_bytes(header[1:3], 'big')
+            width = int.from_bytes(header[3:5], 'big')
+            return width, height
+
+        f.seek(int.from_bytes(length, 'big') - 2, io.SEEK_CUR)
+
+
+def reduced_decode_flag(image_size, target_size, min_long_side=0):
+    """Hedef boyutun altına düşmeyen en büyük küçültmeli çözme bayrağını seç
+
+    min_long_side, çözülen karenin uzun kenarı için ayrıca bir alt sınırdır
+    (ör. etiketli çıktı bu boyutta kaydedilecekse).
+    """
+    if image_size is None:
+        return cv2.IMREAD_COLOR
+
+    # EXIF döndürmesi genişlik/yüksekliği değiştirebilir, kısa kenara bakılır
+    short_side = min(image_size)
+    long_side = max(image_size)
+    needed = max(target_size)
+    for factor, flag in REDUCED_FLAGS:
+        if short_side // factor >= needed and long_side // factor >= min_long_side:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def imread_reduced(image_path, target_size, min_long_side=0):
+    """Büyük JPEG dosyalarını gerektiği kadar küçük ölçekte çöz"""
+    with open(image_path, 'rb') as f:
+        image_size = jpeg_size(f)
+    flag = reduced_decode_flag(image_size, target_size, min_long_side)
+    return cv2.imread(image_path, flag)
+
+
+def imdecode_reduced(data, target_size, min_long_side=0):
+    """Bellekteki JPEG baytlarını gerektiği kadar küçük ölçekte çöz"""
+    image_size = jpeg_size(io.BytesIO(data))
+    flag = reduced_decode_flag(image_size, target_size, min_long_side)
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
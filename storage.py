@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sonuç Depolama / Result Storage
+Salt-ekleme sonuç günlüğü, istatistik deposu, arka plan yazıcı ve
+toplu çalıştırma kontrol noktaları.
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+
+def connect_sqlite(db_path):
+    """Paylaşılan SQLite bağlantısı aç (iş parçacıkları arası, WAL modunda)
+
+    WAL modunda her commit'te fsync gerekmez (synchronous=NORMAL); SD kart
+    yazma gecikmesi azalır, elektrik kesintisinde en fazla son commit'ler
+    kaybolur, veritabanı bozulmaz.
+    """
+    db = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA synchronous=NORMAL')
+    return db
+
+
+class ResultLog:
+    """Boyuta göre dönen JSONL segmentlerine yazan salt-ekleme sonuç günlüğü
+
+    Her sonuç tek satır olarak ve tek bir write çağrısıyla eklenir. Segment
+    adları açılış zamanı ve süreç kimliği içerir; böylece aynı klasöre
+    yazan birden fazla süreç birbirinin dosyasını döndürmez.
+    """
+
+    def __init__(self, directory, max_segment_bytes=64 * 1024 * 1024,
+                 prefix='results'):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        name = f"{self.prefix}-{datetime.now():%Y%m%d%H%M%S%f}-{os.getpid()}.jsonl"
+        self._file = open(self.directory / name, 'ab')
+        self._size = self._file.tell()
+
+    def append(self, result, flush=True):
+        """Sonucu günlüğe ekle; yoksa result['id'] atanır ve döndürülür"""
+        result.setdefault('id', uuid.uuid4().hex)
+        line = json.dumps(result, ensure_ascii=False,
+                          separators=(',', ':')).encode('utf-8') + b'\n'
+
+        with self._lock:
+            if self._file is None or self._size >= self.max_segment_bytes:
+                self._rotate()
+            self._file.write(line)
+            if flush:
+                self._file.flush()
+            self._size += len(line)
+        return result['id']
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def __iter__(self):
+        return iter_results(self.directory, self.prefix)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def iter_results(directory, prefix='results'):
+    """Günlükteki sonuçları segment sırasıyla tek tek üret"""
+    for segment in sorted(Path(directory).glob(f"{prefix}-*.jsonl")):
+        with open(segment, 'r', encoding='utf-8') as f:
+            for line in f:
+                # Yarım kalmış son satır (ör. elektrik kesintisi) atlanır
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+_BITTI = object()  # Kuyruk sonu işareti
+
+
+class BackgroundWriter:
+    """Sonuç ve görüntü yazma işlerini sıcak yoldan alan sınırlı arka plan yazıcı
+
+    İşler toplu halde çalıştırılır; her toplu işin sonunda işlerin verdiği
+    flush çağrıları bir kez yapılır. Kuyruk doluysa submit bekler, böylece
+    depolama geride kaldığında bellek sınırsız büyümez.
+    """
+
+    def __init__(self, max_queue=256, batch_size=32, logger=None):
+        self.batch_size = batch_size
+        self.logger = logger or logging.getLogger(__name__)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name='background-writer',
+                                        daemon=True)
+        self._closed = False
+        self._thread.start()
+
+    @property
+    def depth(self):
+        """Bekleyen yazma işi sayısı"""
+        return self._queue.qsize()
+
+    def drain(self):
+        """Şu ana kadar gönderilen tüm işler yazılana kadar bekle"""
+        self._queue.join()
+
+    def submit(self, fn, *args, flush=None):
+        """fn(*args) işini kuyruğa ekle; flush toplu iş sonunda çağrılır"""
+        if self._closed:
+            raise RuntimeError('BackgroundWriter kapatıldı')
+        self._queue.put((fn, args, flush))
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            done = False
+            flushes = {}
+            for job in jobs:
+                if job is _BITTI:
+                    done = True
+                    continue
+                fn, args, flush = job
+                try:
+                    fn(*args)
+                except Exception as e:
+                    self.logger.error(f"✗ Arka plan yazma hatası: {e}")
+                if flush is not None:
+                    flushes[flush] = flush
+
+            for flush in flushes.values():
+                try:
+                    flush()
+                except Exception as e:
+                    self.logger.error(f"✗ Arka plan flush hatası: {e}")
+
+            for _ in jobs:
+                self._queue.task_done()
+
+            if done:
+                return
+
+    def close(self):
+        """Kuyruktaki tüm işler yazılana kadar bekle ve durdur"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_BITTI)
+        self._thread.join()
+
+
+class StatsStore:
+    """Etiket başına sayaç satırları tutan SQLite istatistik deposu
+
+    Her yeni sonuçta ilgili sayaç bir artırılır; toplamlar dosya taramadan,
+    sabit sürede okunur.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(self.db_path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS label_counts ('
+                         'label TEXT PRIMARY KEY, count INTEGER NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._db.commit()
+
+    def record(self, prediction, count=1, commit=True):
+        """Bir tahmin etiketinin sayacını artır
+
+        commit=False ise kalıcılık sonraki commit() çağrısına bırakılır
+        (ör. arka plan yazıcısının toplu iş sonu flush'ı).
+        """
+        with self._lock:
+            self._db.execute(
+                'INSERT INTO label_counts VALUES (?, ?) '
+                'ON CONFLICT(label) DO UPDATE SET count = count + excluded.count',
+                (prediction, count)
+            )
+            if commit:
+                self._db.commit()
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def totals(self, labels):
+        """(toplam, {etiket: sayı}) döndür; bilinmeyen etiketler toplama dahil"""
+        with self._lock:
+            rows = self._db.execute('SELECT label, count FROM label_counts').fetchall()
+
+        predictions = {label: 0 for label in labels}
+        total = 0
+        for label, count in rows:
+            total += count
+            if label in predictions:
+                predictions[label] = count
+        return total, predictions
+
+    def backfill(self, results_dir, pattern='*.json'):
+        """Mevcut JSON sonuç dosyalarını bir kez içe aktar
+
+        Daha önce yapıldıysa hiçbir şey yapmaz ve None döndürür, aksi halde
+        içe aktarılan dosya sayısını döndürür. Kontrol ve yazma tek bir yazma
+        işleminde yapılır; aynı anda başlayan süreçlerden yalnızca biri
+        içe aktarır.
+        """
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                done = self._db.execute("SELECT value FROM meta WHERE key = 'backfilled'").fetchone()
+                if done:
+                    self._db.rollback()
+                    return None
+
+                counts = {}
+                imported = 0
+                for result_file in Path(results_dir).glob(pattern):
+                    try:
+                        with open(result_file, 'r', encoding='utf-8') as f:
+                            prediction = json.load(f).get('prediction', '')
+                    except (OSError, ValueError):
+                        prediction = ''
+                    counts[prediction] = counts.get(prediction, 0) + 1
+                    imported += 1
+
+                self._db.executemany(
+                    'INSERT INTO label_counts VALUES (?, ?) '
+                    'ON CONFLICT(label) DO UPDATE SET count = count + excluded.count',
+                    counts.items()
+                )
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('backfilled', ?)",
+                                 (str(imported),))
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+
+class RunManifest:
+    """Toplu çalıştırmanın kontrol noktası: işlenen dosyalar ve tahminleri
+
+    SQLite'ta tutulur, böylece bellek kullanımı klasör boyutundan
+    bağımsızdır; --resume ile yarıda kalan çalıştırma kaldığı yerden sürer.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(self.db_path)
+        self._db.execute('CREATE TABLE IF NOT EXISTS done ('
+                         'path TEXT PRIMARY KEY, prediction TEXT NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self._db.commit()
+
+    def get_meta(self, key):
+        with self._lock:
+            row = self._db.execute('SELECT value FROM meta WHERE key = ?',
+                                   (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                             (key, str(value)))
+            self._db.commit()
+
+    def reset(self):
+        """Yeni bir çalıştırma için tüm kayıtları sil"""
+        with self._lock:
+            self._db.execute('DELETE FROM done')
+            self._db.execute('DELETE FROM meta')
+            self._db.commit()
+
+    def is_done(self, path):
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM done WHERE path = ?',
+                                    (os.path.abspath(path),)).fetchone() is not None
+
+    def mark(self, path, prediction):
+        """Dosyayı işlendi olarak işaretle (commit() ile kalıcı olur)"""
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO done VALUES (?, ?)',
+                             (os.path.abspath(path), prediction))
+
+    def commit(self):
+        with self._lock:
+            self._db.commit()
+
+    def counts(self):
+        """{tahmin: sayı} döndür"""
+        with self._lock:
+            rows = self._db.execute('SELECT prediction, COUNT(*) FROM done '
+                                    'GROUP BY prediction').fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._db.commit()
+            self._db.close()
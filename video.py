@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Video Analizi / Video Analysis
+Kare örnekleme, sahne değişimi algılama, zamansal yumuşatma ve tahminleri
+bölümlere ayıran zaman çizelgesi.
+"""
+
+import cv2
+import numpy as np
+
+
+def open_video(source):
+    """Video dosyası, akış adresi ya da kamera aygıt numarası aç"""
+    capture = cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    if not capture.isOpened():
+        raise IOError(f"Video açılamadı: {source}")
+    return capture
+
+
+class ChangeDetector:
+    """Küçültülmüş gri karelerin ortalama mutlak farkıyla sahne değişimi
+
+    Karşılaştırma bir önceki kareyle değil, son çıkarım yapılan kareyle
+    yapılır; böylece yavaş kaymalar da birikerek eşiği aşar.
+    """
+
+    def __init__(self, threshold=6.0, size=(64, 48)):
+        self.threshold = threshold
+        self.size = tuple(size)
+        self._reference = None
+
+    def changed(self, frame):
+        """Kare referanstan yeterince farklıysa True döndür ve referans yap"""
+        small = cv2.cvtColor(cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY)
+        if (self._reference is not None and self.threshold > 0
+                and cv2.absdiff(small, self._reference).mean() < self.threshold):
+            return False
+        self._reference = small
+        return True
+
+
+class ScoreSmoother:
+    """Skor vektörleri üzerinde üstel hareketli ortalama (alpha = yeni karenin ağırlığı)"""
+
+    def __init__(self, alpha=0.3):
+        self.alpha = alpha
+        self._state = None
+
+    def update(self, scores):
+        scores = np.asarray(scores, dtype=np.float32)
+        if self._state is None or self.alpha >= 1:
+            self._state = scores.copy()
+        else:
+            self._state += self.alpha * (scores - self._state)
+        return self._state
+
+
+class SegmentTracker:
+    """Yumuşatılmış tahmini aynı kalan ardışık kareleri tek bölümde topla
+
+    Etiket değiştiğinde kapanan bölüm on_segment(bölüm sözlüğü) ile bildirilir.
+    """
+
+    def __init__(self, labels, on_segment, min_confidence=0.0):
+        self.labels = list(labels)
+        self.on_segment = on_segment
+        self.min_confidence = min_confidence
+        self.segments = 0
+        self._current = None
+
+    def add(self, frame_index, seconds, scores, inferred):
+        index = int(np.argmax(scores))
+        current = self._current
+        if current is not None and current['index'] != index:
+            self._close()
+            current = None
+
+        if current is None:
+            current = self._current = {
+                'index': index,
+                'start_frame': frame_index,
+                'start': seconds,
+                'frames': 0,
+                'inferences': 0,
+                'score_sum': np.zeros(len(self.labels), dtype=np.float64)
+            }
+        current['end_frame'] = frame_index
+        current['end'] = seconds
+        current['frames'] += 1
+        current['inferences'] += int(inferred)
+        current['score_sum'] += scores
+
+    def _close(self):
+        current, self._current = self._current, None
+        mean_scores = current['score_sum'] / current['frames']
+        confidence = float(mean_scores[current['index']])
+        self.segments += 1
+        self.on_segment({
+            'prediction': self.labels[current['index']],
+            'confidence': confidence,
+            'is_confident': confidence >= self.min_confidence,
+            'start': round(current['start'], 3),
+            'end': round(current['end'], 3),
+            'start_frame': current['start_frame'],
+            'end_frame': current['end_frame'],
+            'frames': current['frames'],
+            'inferences': current['inferences'],
+            'mean_scores': {label: float(score)
+                            for label, score in zip(self.labels, mean_scores)}
+        })
+
+    def close(self):
+        """Açık bölümü kapat"""
+        if self._current is not None:
+            self._close()
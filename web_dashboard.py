@@ -5,17 +5,31 @@
 Ultra Advanced Web Interface with Real-time Analytics
 """
 
-from flask import Flask, render_template_string, request, jsonify, send_file
-import tensorflow as tf
-import cv2
+from flask import Flask, Response, render_template_string, request, jsonify, send_file
 import numpy as np
 from datetime import datetime, timedelta
 import os
+import sys
 import json
 from pathlib import Path
 import base64
+import uuid
+import functools
 from collections import Counter
 import io
+import math
+import queue
+import atexit
+import argparse
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from inference import MicroBatcher, batch_buckets, load_backend, prepare_artifact, uses_artifact
+from preprocessing import IMAGE_EXTENSIONS, Preprocessor, imdecode_reduced
+from cache import PredictionCache, content_digest, model_identity
+from storage import BackgroundWriter, ResultLog, StatsStore
 
 # ===============================
 # FLASK APP
@@ -26,6 +40,22 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 app.config['UPLOAD_FOLDER'] = 'web_uploads'
 
 MODEL_PATH = 'YZDBHTS_colab.h5'
+BACKEND = os.environ.get('YZDBHTS_BACKEND', 'keras')  # 'keras' or 'tflite'
+TFLITE_THREADS = int(os.environ.get('YZDBHTS_TFLITE_THREADS', '4'))
+KERAS_THREADS = int(os.environ.get('YZDBHTS_KERAS_THREADS', '0')) or None  # None = all cores
+MODEL_CACHE = os.environ.get('YZDBHTS_MODEL_CACHE', 'model_cache')  # '' = always load the .h5
+MAX_BATCH_SIZE = int(os.environ.get('YZDBHTS_MAX_BATCH_SIZE', '8'))
+MAX_BATCH_WAIT_MS = float(os.environ.get('YZDBHTS_MAX_BATCH_WAIT_MS', '5'))
+SAVE_UPLOADS = os.environ.get('YZDBHTS_SAVE_UPLOADS', '1') == '1'
+WRITE_QUEUE_SIZE = int(os.environ.get('YZDBHTS_WRITE_QUEUE_SIZE', '256'))
+CACHE_SIZE = int(os.environ.get('YZDBHTS_CACHE_SIZE', '1024'))
+CACHE_DB = os.environ.get('YZDBHTS_CACHE_DB', 'prediction_cache.sqlite')  # '' = memory only
+DECODE_WORKERS = int(os.environ.get('YZDBHTS_DECODE_WORKERS', os.cpu_count() or 1))
+ASYNC_INFLIGHT = int(os.environ.get('YZDBHTS_ASYNC_INFLIGHT', str(MAX_BATCH_SIZE * 4)))
+BATCH_MAX_FILES = int(os.environ.get('YZDBHTS_BATCH_MAX_FILES', '64'))  # per /predict/batch request
+BATCH_MAX_BYTES = int(os.environ.get('YZDBHTS_BATCH_MAX_BYTES', str(64 * 1024 * 1024)))
+QUEUE_DEPTH = int(os.environ.get('YZDBHTS_QUEUE_DEPTH', str(MAX_BATCH_SIZE * 8)))  # queued images; 0 = unbounded
+CLIENT_CONCURRENCY = int(os.environ.get('YZDBHTS_CLIENT_CONCURRENCY', '4'))  # requests per client; 0 = unlimited
 TARGET_SIZE = (224, 224)
 LABELS = ["Külleme", "Leke", "Pas", "Sağlıklı"]
 LABEL_EN = {"Külleme": "Powdery Mildew", "Leke": "Leaf Spot", "Pas": "Rust", "Sağlıklı": "Healthy"}
@@ -33,12 +63,200 @@ LABEL_EN = {"Külleme": "Powdery Mildew", "Leke": "Leaf Spot", "Pas": "Rust", "S
 Path(app.config['UPLOAD_FOLDER']).mkdir(exist_ok=True)
 Path('web_results').mkdir(exist_ok=True)
 
-try:
-    model = tf.keras.models.load_model(MODEL_PATH, compile=False)
-    print(f"✓ Model loaded: {MODEL_PATH}")
-except Exception as e:
-    print(f"✗ Model loading error: {e}")
-    model = None
+# Per-process serving state. Threads and SQLite connections do not survive
+# fork(), so every serving process builds its own in start_worker(): each
+# pre-forked worker under `serve`, otherwise the process handling requests.
+model = None
+result_log = None
+stats_store = None
+writer = None
+preprocessor = None
+batcher = None
+cache = None
+decode_pool = None
+admission = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def process_memory():
+    """Memory of this process in MB: resident, proportional (shared pages
+    split between the processes mapping them), private and shared (Linux)"""
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if value.rstrip().endswith('kB'):
+                    fields[key] = int(value.split()[0])
+    except OSError:
+        return {}
+
+    memory = {
+        'rss_mb': fields.get('Rss', 0),
+        'pss_mb': fields.get('Pss', 0),
+        'private_mb': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+        'shared_mb': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0)
+    }
+    return {key: round(kb / 1024, 1) for key, kb in memory.items()}
+
+
+def start_worker():
+    """Load the model and start this process's batcher, writer and stores"""
+    global model, result_log, stats_store, writer, preprocessor, batcher, cache, decode_pool, admission, _worker_pid
+
+    # Results are appended to rotating JSONL segments under web_results/log;
+    # segment names include the pid, so workers never share a file
+    result_log = ResultLog('web_results/log')
+
+    # /stats reads incrementally maintained counters instead of rescanning
+    # web_results; files written before the store existed are imported once
+    stats_store = StatsStore('web_results/stats.sqlite')
+    imported = stats_store.backfill('web_results')
+    if imported is not None:
+        print(f"✓ Stats store backfilled from {imported} result files")
+
+    try:
+        # The .h5 is converted once into MODEL_CACHE (keyed by its hash) and
+        # later starts load the converted copy
+        threads = TFLITE_THREADS if BACKEND == 'tflite' else KERAS_THREADS
+        model = load_backend(BACKEND, MODEL_PATH, threads, MODEL_CACHE or None)
+        info = model.load_info
+        if info['convert_time'] is not None:
+            print(f"✓ Model converted (cold start): {info['artifact']} in {info['convert_time']:.3f}s")
+        print(f"✓ Model loaded: {model.model_path} ({BACKEND}, {info['load_time']:.3f}s"
+              f"{', warm start from cache' if info['cached'] else ''})")
+        # Warm up every batch size the micro-batcher runs (TFLite keeps one
+        # interpreter per size, so these are the only shapes ever served)
+        warmup_time = model.warmup(batch_buckets(MAX_BATCH_SIZE))
+        print(f"✓ Model warmed up: {warmup_time:.3f}s")
+    except Exception as e:
+        print(f"✗ Model loading error: {e}")
+        model = None
+
+    # Uploads are decoded in memory; originals and result records are persisted
+    # by a bounded background writer that is drained on shutdown
+    writer = BackgroundWriter(WRITE_QUEUE_SIZE)
+    atexit.register(writer.close)
+
+    # Concurrent /predict requests share forward passes through one batcher;
+    # normalization happens per batch in the batcher thread, same as the CLI.
+    # Its queue is bounded: past QUEUE_DEPTH images new work gets a 429
+    preprocessor = Preprocessor(TARGET_SIZE, MAX_BATCH_SIZE)
+    batcher = MicroBatcher(model, preprocessor, MAX_BATCH_SIZE,
+                           MAX_BATCH_WAIT_MS / 1000, QUEUE_DEPTH) if model else None
+    admission = AdmissionControl(CLIENT_CONCURRENCY)
+
+    # Re-uploaded photos are answered from a content-addressed cache; the key
+    # includes the model file hash, so replacing the model invalidates it
+    cache = PredictionCache(model_identity(model), CACHE_SIZE, CACHE_DB or None) if model else None
+
+    # Hashing, cache lookups and decoding for batch and async uploads
+    decode_pool = ThreadPoolExecutor(max_workers=max(1, DECODE_WORKERS),
+                                     thread_name_prefix='decode')
+
+    _worker_pid = os.getpid()
+    memory = process_memory()
+    if memory:
+        print(f"✓ Worker {_worker_pid} ready: RSS {memory['rss_mb']} MB, "
+              f"PSS {memory['pss_mb']} MB, private {memory['private_mb']} MB")
+
+
+class AdmissionControl:
+    """Per-client concurrency limit and reject counters for this process
+
+    Checked before a request body is read, so an overloaded server answers
+    429 right away instead of queueing work it cannot finish in time.
+    """
+
+    def __init__(self, per_client):
+        self.per_client = per_client
+        self._lock = threading.Lock()
+        self._active = Counter()
+        self.rejected = Counter()
+
+    def acquire(self, client):
+        """Take a request slot for client; False if it is at its limit"""
+        with self._lock:
+            if self.per_client and self._active[client] >= self.per_client:
+                self.rejected['client_limit'] += 1
+                return False
+            self._active[client] += 1
+            return True
+
+    def release(self, client):
+        with self._lock:
+            self._active[client] -= 1
+            if self._active[client] <= 0:
+                del self._active[client]
+
+    def reject(self, reason):
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'active_clients': len(self._active),
+                'active_requests': sum(self._active.values()),
+                'rejected': dict(self.rejected)
+            }
+
+
+def admit(client):
+    """Take a slot for client, or return why the request must be rejected"""
+    if batcher is not None and batcher.full():
+        admission.reject('queue_full')
+        return 'Inference queue full'
+    if not admission.acquire(client):
+        return 'Too many concurrent requests from this client'
+    return None
+
+
+def busy_payload(error):
+    """429 body and Retry-After seconds: the estimated time to drain the queue"""
+    seconds = max(1, math.ceil(batcher.drain_time())) if batcher is not None else 1
+    return {'success': False, 'error': error, 'retry_after': seconds}, seconds
+
+
+def busy_response(error):
+    payload, seconds = busy_payload(error)
+    response = jsonify(payload)
+    response.status_code = 429
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+
+def admitted(view):
+    """Apply admission control to a Flask view
+
+    The client's slot is held until the response is closed, so streamed
+    responses keep it for as long as they run.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        client = request.remote_addr
+        error = admit(client)
+        if error:
+            return busy_response(error)
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except Exception:
+            admission.release(client)
+            raise
+        response.call_on_close(lambda: admission.release(client))
+        return response
+    return wrapper
+
+
+@app.before_request
+def ensure_worker():
+    """Start per-process state on first use (e.g. under a plain WSGI server)"""
+    if _worker_pid != os.getpid():
+        with _worker_lock:
+            if _worker_pid != os.getpid():
+                start_worker()
+
 
 # ===============================
 # ULTRA ADVANCED HTML TEMPLATE
@@ -843,22 +1061,130 @@ HTML_TEMPLATE = '''
         });
 
         batchInput.addEventListener('change', (e) => {
-            const files = Array.from(e.target.files);
-            showNotification(`Processing ${files.length} images...`);
-            files.forEach(file => handleImageSelect(file, true));
+            const files = Array.from(e.target.files).filter(file => file.type.startsWith('image/'));
+            if (files.length) analyzeBatch(files);
+            e.target.value = '';
         });
 
-        function handleImageSelect(file, batch = false) {
+        // Batch uploads: one /predict/batch request per chunk, results stream
+        // back as NDJSON lines in completion order
+        const BATCH_CHUNK_FILES = 16;
+        const BATCH_CHUNK_BYTES = 32 * 1024 * 1024;
+
+        function chunkFiles(files) {
+            const chunks = [];
+            let chunk = [];
+            let bytes = 0;
+            files.forEach(file => {
+                if (chunk.length && (chunk.length >= BATCH_CHUNK_FILES || bytes + file.size > BATCH_CHUNK_BYTES)) {
+                    chunks.push(chunk);
+                    chunk = [];
+                    bytes = 0;
+                }
+                chunk.push(file);
+                bytes += file.size;
+            });
+            if (chunk.length) chunks.push(chunk);
+            return chunks;
+        }
+
+        async function readLines(response, onLine) {
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\\n');
+                buffer = lines.pop();
+                lines.filter(line => line.trim()).forEach(line => onLine(JSON.parse(line)));
+            }
+            if (buffer.trim()) onLine(JSON.parse(buffer));
+        }
+
+        function showBatchResult(result, file) {
+            const reader = new FileReader();
+            reader.onload = (e) => {
+                imagePreview.src = e.target.result;
+                previewSection.style.display = 'block';
+                displayResult(result);
+                addToHistory(result, e.target.result);
+            };
+            reader.readAsDataURL(file);
+        }
+
+        async function analyzeBatch(files) {
+            showNotification(`Processing ${files.length} images...`);
+            loading.style.display = 'block';
+            analyzeBtn.disabled = true;
+
+            let completed = 0;
+            let failed = 0;
+            try {
+                for (const chunk of chunkFiles(files)) {
+                    // Images the server reports busy (whole request or per item)
+                    // are resent after the wait it asks for
+                    let pending = chunk;
+                    for (let attempt = 1; attempt <= 5 && pending.length; attempt++) {
+                        const formData = new FormData();
+                        pending.forEach(file => formData.append('images', file));
+
+                        const response = await fetch('/predict/batch', {
+                            method: 'POST',
+                            body: formData
+                        });
+
+                        const sent = pending;
+                        let wait = 0;
+                        pending = [];
+                        if (response.status === 429) {
+                            wait = parseInt(response.headers.get('Retry-After') || '1', 10);
+                            pending = sent;
+                        } else if (!(response.headers.get('Content-Type') || '').includes('ndjson')) {
+                            const result = await response.json();
+                            failed += sent.length;
+                            showNotification('Error: ' + result.error, 'error');
+                            break;
+                        } else {
+                            await readLines(response, result => {
+                                if (result.success) {
+                                    completed++;
+                                    showBatchResult(result, sent[result.index]);
+                                } else if (result.retry_after) {
+                                    pending.push(sent[result.index]);
+                                    wait = Math.max(wait, result.retry_after);
+                                } else {
+                                    failed++;
+                                }
+                            });
+                            updateStats();
+                        }
+
+                        if (pending.length && attempt < 5) {
+                            showNotification(`Server busy, retrying ${pending.length} image(s) in ${wait}s...`, 'error');
+                            await new Promise(resolve => setTimeout(resolve, wait * 1000));
+                        }
+                    }
+                    failed += pending.length;
+                }
+                showNotification(`Batch complete: ${completed} analyzed` + (failed ? `, ${failed} failed` : ''),
+                                 failed ? 'error' : 'success');
+            } catch (error) {
+                showNotification('Connection error: ' + error.message, 'error');
+            } finally {
+                loading.style.display = 'none';
+                analyzeBtn.disabled = false;
+            }
+        }
+
+        function handleImageSelect(file) {
             if (file && file.type.startsWith('image/')) {
                 const reader = new FileReader();
                 reader.onload = (e) => {
                     imagePreview.src = e.target.result;
                     previewSection.style.display = 'block';
                     resultContainer.style.display = 'none';
-
-                    if (batch) {
-                        analyzeImage(file);
-                    }
                 };
                 reader.readAsDataURL(file);
             }
@@ -1200,19 +1526,119 @@ HTML_TEMPLATE = '''
 # HELPER FUNCTIONS
 # ===============================
 
-def preprocess_image(image_path):
-    """Image preprocessing"""
-    img = cv2.imread(image_path)
-    img_resized = cv2.resize(img, TARGET_SIZE)
-    img_array = np.expand_dims(img_resized, axis=0)
-    img_normalized = (img_array / 127.5) - 1
-    return img_normalized
+def decode_upload(data):
+    """Decode upload bytes in memory and resize to TARGET_SIZE (uint8)"""
+    img = imdecode_reduced(data, TARGET_SIZE)
+    if img is None:
+        raise ValueError('Could not decode image')
+    return preprocessor.resize(img)
+
+
+def write_upload(filepath, data):
+    """Persist an original upload (runs on the background writer)"""
+    with open(filepath, 'wb') as f:
+        f.write(data)
 
 
 def allowed_file(filename):
     """Check allowed file types"""
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'webp'}
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in IMAGE_EXTENSIONS
+
+
+def lookup_upload(data):
+    """Hash the upload and check the cache; decode only on a miss
+
+    Returns (digest, cached scores or None, resized image or None).
+    """
+    digest = content_digest(data)
+    scores = cache.get(digest)
+    if scores is not None:
+        return digest, scores, None
+    return digest, None, decode_upload(data)
+
+
+def finish_prediction(data, filename, digest, scores, timing, cache_hit):
+    """Build the response for one upload and hand persistence to the writer"""
+    if not cache_hit:
+        # Memory tier now; the SQLite tier is written by the background writer
+        cache.put(digest, scores, writer)
+
+    pred_index = np.argmax(scores)
+    prediction = LABELS[pred_index]
+    confidence = float(scores[pred_index])
+
+    result = {
+        'success': True,
+        'prediction': prediction,
+        'prediction_en': LABEL_EN[prediction],
+        'confidence': confidence,
+        'all_scores': {LABELS[i]: float(scores[i]) for i in range(len(LABELS))},
+        'inference_time': timing['inference_time'],
+        'timing': timing,
+        'cache_hit': cache_hit,
+        'timestamp': datetime.now().isoformat(),
+        'id': uuid.uuid4().hex
+    }
+
+    if SAVE_UPLOADS:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"upload_{timestamp}_{filename}")
+        writer.submit(write_upload, filepath, data)
+    writer.submit(result_log.append, dict(result), False, flush=result_log.flush)
+    writer.submit(stats_store.record, prediction, 1, False, flush=stats_store.commit)
+    return result
+
+
+CACHED_TIMING = {'batch_size': 0, 'queue_wait': 0.0, 'inference_time': 0.0}
+
+
+def submit_upload(index, filename, data, on_done):
+    """Start decode -> inference -> persist for one image of a batch upload
+
+    Nothing blocks on the way: decoding runs on decode_pool, misses are queued
+    on the micro-batcher (so images of a batch share forward passes) and
+    on_done(result) is called from a worker thread with 'index' and
+    'filename' added to the result.
+    """
+    def report(result):
+        on_done(dict(result, index=index, filename=filename))
+
+    def finish(digest, scores, timing, cache_hit):
+        try:
+            report(finish_prediction(data, filename, digest, scores, timing, cache_hit))
+        except Exception as e:
+            report({'success': False, 'error': str(e)})
+
+    def scored(digest, future):
+        try:
+            scores, timing = future.result()
+        except Exception as e:
+            report({'success': False, 'error': str(e)})
+            return
+        # Keep cache/writer work off the batcher thread
+        decode_pool.submit(finish, digest, scores, timing, False)
+
+    def decoded(future):
+        try:
+            digest, scores, resized = future.result()
+        except Exception as e:
+            report({'success': False, 'error': str(e)})
+            return
+        if scores is not None:
+            finish(digest, scores, CACHED_TIMING, True)
+            return
+        try:
+            pending = batcher.enqueue(resized)
+        except queue.Full:
+            admission.reject('queue_full')
+            report(busy_payload('Inference queue full')[0])
+            return
+        pending.add_done_callback(lambda f: scored(digest, f))
+
+    if not allowed_file(filename):
+        report({'success': False, 'error': 'Invalid file type'})
+        return
+    decode_pool.submit(lookup_upload, data).add_done_callback(decoded)
 
 
 # ===============================
@@ -1226,6 +1652,7 @@ def index():
 
 
 @app.route('/predict', methods=['POST'])
+@admitted
 def predict():
     """Prediction endpoint"""
     if model is None:
@@ -1241,75 +1668,340 @@ def predict():
 
     if file and allowed_file(file.filename):
         try:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"upload_{timestamp}_{file.filename}"
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-
-            processed_image = preprocess_image(filepath)
-
-            import time
-            start_time = time.time()
-            predictions = model.predict(processed_image, verbose=0)
-            inference_time = time.time() - start_time
-
-            pred_index = np.argmax(predictions)
-            prediction = LABELS[pred_index]
-            prediction_en = LABEL_EN[prediction]
-            confidence = float(predictions[0][pred_index])
-
-            all_scores = {
-                LABELS[i]: float(predictions[0][i])
-                for i in range(len(LABELS))
-            }
+            data = file.read()
+            digest, scores, resized = lookup_upload(data)
+            cache_hit = scores is not None
+            if cache_hit:
+                timing = CACHED_TIMING
+            else:
+                scores, timing = batcher.submit(resized)
+
+            return jsonify(finish_prediction(data, file.filename, digest,
+                                             scores, timing, cache_hit))
+
+        except queue.Full:
+            admission.reject('queue_full')
+            return busy_response('Inference queue full')
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e)})
 
-            result = {
-                'success': True,
-                'prediction': prediction,
-                'prediction_en': prediction_en,
-                'confidence': confidence,
-                'all_scores': all_scores,
-                'inference_time': inference_time,
-                'timestamp': datetime.now().isoformat()
-            }
+    return jsonify({'success': False, 'error': 'Invalid file type'})
 
-            result_path = f"web_results/result_{timestamp}.json"
-            with open(result_path, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
 
-            return jsonify(result)
+@app.route('/predict/batch', methods=['POST'])
+@admitted
+def predict_batch():
+    """Multi-image prediction; streams one JSON line per image (NDJSON) in
+    completion order, each carrying the 'index' of its file in the request"""
+    if model is None:
+        return jsonify({'success': False, 'error': 'Model not loaded'})
 
-        except Exception as e:
-            return jsonify({'success': False, 'error': str(e)})
+    request.max_content_length = BATCH_MAX_BYTES
+    try:
+        files = [f for f in request.files.getlist('images') if f.filename]
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
 
-    return jsonify({'success': False, 'error': 'Invalid file type'})
+    if not files:
+        return jsonify({'success': False, 'error': 'No images provided'})
+    if len(files) > BATCH_MAX_FILES:
+        return jsonify({'success': False, 'error': f'Too many images (max {BATCH_MAX_FILES})'})
+
+    done = queue.Queue()
+    for index, file in enumerate(files):
+        submit_upload(index, file.filename, file.read(), done.put)
+
+    def stream():
+        for _ in files:
+            yield json.dumps(done.get()) + '\n'
+
+    return Response(stream(), mimetype='application/x-ndjson')
 
 
 @app.route('/stats')
 def stats():
     """Statistics endpoint"""
     try:
-        results_dir = Path('web_results')
-        result_files = list(results_dir.glob('*.json'))
+        return jsonify(stats_payload())
+
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)})
+
 
-        total = len(result_files)
-        predictions = {label: 0 for label in LABELS}
+def stats_payload():
+    """Counters reported by /stats (shared by the Flask and async servers)"""
+    total, predictions = stats_store.totals(LABELS)
+    return {
+        'success': True,
+        'total': total,
+        'predictions': predictions,
+        'write_queue_depth': writer.depth,
+        'worker': {'pid': os.getpid(), **process_memory()},
+        # Per worker: inference queue and admission counters
+        'admission': {**(batcher.stats() if batcher is not None else {}),
+                      **admission.snapshot()}
+    }
 
-        for result_file in result_files:
-            with open(result_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                pred = data.get('prediction', '')
-                if pred in predictions:
-                    predictions[pred] += 1
 
-        return jsonify({
-            'success': True,
-            'total': total,
-            'predictions': predictions
-        })
+# ===============================
+# PRODUCTION SERVER
+# ===============================
 
+def prepare_model():
+    """Convert the model artifact once, before any worker is forked
+
+    The conversion runs in a spawned process so TensorFlow is never
+    initialised in the master: its runtime threads would not survive fork.
+    """
+    if not uses_artifact(BACKEND, MODEL_PATH, MODEL_CACHE or None):
+        return
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            artifact, convert_time = executor.submit(prepare_artifact, BACKEND,
+                                                     MODEL_PATH, MODEL_CACHE).result()
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        # Workers report the load error themselves and answer 'Model not loaded'
+        print(f"✗ Model conversion error: {e}")
+        return
+    if convert_time is not None:
+        print(f"✓ Model converted (cold start): {artifact} in {convert_time:.3f}s")
+
+
+def serve(argv):
+    """Run the dashboard under gunicorn with pre-forked workers
+
+    The app and its imports are loaded once in the master (preload) and
+    shared copy-on-write; the converted model is prepared there as well.
+    Each worker then loads its backend from the warm artifact: a TFLite
+    flatbuffer is memory-mapped, so its pages are shared by all workers.
+    """
+    global TFLITE_THREADS, KERAS_THREADS
+
+    parser = argparse.ArgumentParser(prog='web_dashboard.py serve',
+                                     description='Production server (gunicorn)')
+    parser.add_argument('--bind', default=os.environ.get('YZDBHTS_BIND', '0.0.0.0:5000'))
+    parser.add_argument('--workers', type=int,
+                        default=int(os.environ.get('YZDBHTS_WORKERS', os.cpu_count() or 1)))
+    parser.add_argument('--threads', type=int, default=MAX_BATCH_SIZE,
+                        help='Request threads per worker (they feed the micro-batcher)')
+    parser.add_argument('--timeout', type=int, default=60)
+    args = parser.parse_args(argv)
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        sys.exit("✗ 'serve' requires gunicorn: pip install gunicorn")
+
+    # Cores are split between workers so inference threads don't oversubscribe
+    workers = max(1, args.workers)
+    TFLITE_THREADS = max(1, TFLITE_THREADS // workers)
+    KERAS_THREADS = max(1, (KERAS_THREADS or os.cpu_count() or 1) // workers)
+    prepare_model()
+
+    class DashboardServer(BaseApplication):
+        def load_config(self):
+            options = {
+                'bind': args.bind,
+                'workers': workers,
+                'worker_class': 'gthread',
+                'threads': max(1, args.threads),
+                'timeout': args.timeout,
+                'preload_app': True,
+                'post_fork': lambda server, worker: start_worker()
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    print(f"✓ Serving on {args.bind}: {workers} workers x {max(1, args.threads)} threads")
+    DashboardServer().run()
+
+
+# ===============================
+# ASYNC SERVER
+# ===============================
+
+async def read_upload(part, limit):
+    """Read one multipart field chunk by chunk without blocking the loop"""
+    data = bytearray()
+    while True:
+        chunk = await part.read_chunk()
+        if not chunk:
+            return bytes(data)
+        data.extend(chunk)
+        if len(data) > limit:
+            raise ValueError('File too large')
+
+
+def create_async_app():
+    """aiohttp application serving the dashboard with an asyncio-native /predict
+
+    Uploads are read on the event loop, so a slow client costs a coroutine
+    rather than a request thread. Hashing, cache lookups and decoding run on a
+    decode thread pool, and inference runs on the micro-batcher's dedicated
+    thread. At most ASYNC_INFLIGHT requests are past the upload stage at once;
+    further requests wait for a slot rather than being rejected. The 429s come
+    from admission control: a full inference queue or a client over its limit.
+    """
+    from aiohttp import web
+
+    max_upload = app.config['MAX_CONTENT_LENGTH']
+    state = {}  # asyncio primitives are created on the serving loop
+
+    def busy_response_async(error):
+        payload, seconds = busy_payload(error)
+        return web.json_response(payload, status=429,
+                                 headers={'Retry-After': str(seconds)})
+
+    @web.middleware
+    async def admission_middleware(request, handler):
+        # Same limits as the Flask views, applied before the upload is read
+        if request.path not in ('/predict', '/predict/batch'):
+            return await handler(request)
+        client = request.remote
+        error = admit(client)
+        if error:
+            return busy_response_async(error)
+        try:
+            return await handler(request)
+        finally:
+            admission.release(client)
+
+    async def index_async(request):
+        return web.Response(text=HTML_TEMPLATE, content_type='text/html')
+
+    async def predict_async(request):
+        if model is None:
+            return web.json_response({'success': False, 'error': 'Model not loaded'})
+
+        data = filename = None
+        try:
+            reader = await request.multipart()
+            while True:
+                part = await reader.next()
+                if part is None:
+                    break
+                if part.name == 'image':
+                    filename = part.filename or ''
+                    data = await read_upload(part, max_upload)
+                    break
+        except Exception as e:
+            return web.json_response({'success': False, 'error': str(e)})
+
+        if data is None:
+            return web.json_response({'success': False, 'error': 'No image provided'})
+        if filename == '':
+            return web.json_response({'success': False, 'error': 'No file selected'})
+        if not allowed_file(filename):
+            return web.json_response({'success': False, 'error': 'Invalid file type'})
+
+        loop = asyncio.get_running_loop()
+        try:
+            async with state['inflight']:
+                digest, scores, resized = await loop.run_in_executor(
+                    decode_pool, lookup_upload, data)
+                cache_hit = scores is not None
+                if cache_hit:
+                    timing = CACHED_TIMING
+                else:
+                    try:
+                        pending = batcher.enqueue(resized)
+                    except queue.Full:
+                        admission.reject('queue_full')
+                        return busy_response_async('Inference queue full')
+                    scores, timing = await asyncio.wrap_future(pending)
+
+            # The writer may block briefly when its queue is full
+            result = await loop.run_in_executor(
+                decode_pool, finish_prediction, data, filename, digest,
+                scores, timing, cache_hit)
+            return web.json_response(result)
+
+        except Exception as e:
+            return web.json_response({'success': False, 'error': str(e)})
+
+    async def stats_async(request):
+        loop = asyncio.get_running_loop()
+        try:
+            payload = await loop.run_in_executor(decode_pool, stats_payload)
+        except Exception as e:
+            payload = {'success': False, 'error': str(e)}
+        return web.json_response(payload)
+
+    async def predict_batch_async(request):
+        if model is None:
+            return web.json_response({'success': False, 'error': 'Model not loaded'})
+
+        # Each image enters the pipeline as soon as its part has arrived, so
+        # decoding and inference overlap the rest of the upload
+        loop = asyncio.get_running_loop()
+        done = asyncio.Queue()
+        count = 0
+        received = 0
+        try:
+            reader = await request.multipart()
+            while True:
+                part = await reader.next()
+                if part is None:
+                    break
+                if part.name != 'images' or not part.filename:
+                    continue
+                if count >= BATCH_MAX_FILES:
+                    raise ValueError(f'Too many images (max {BATCH_MAX_FILES})')
+                data = await read_upload(part, BATCH_MAX_BYTES - received)
+                received += len(data)
+                submit_upload(count, part.filename, data,
+                              lambda result: loop.call_soon_threadsafe(done.put_nowait, result))
+                count += 1
+        except Exception as e:
+            if not count:
+                return web.json_response({'success': False, 'error': str(e)})
+            # Images already submitted are still reported
+            done.put_nowait({'success': False, 'error': str(e), 'index': count, 'filename': None})
+            count += 1
+
+        if not count:
+            return web.json_response({'success': False, 'error': 'No images provided'})
+
+        response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+        await response.prepare(request)
+        for _ in range(count):
+            await response.write((json.dumps(await done.get()) + '\n').encode('utf-8'))
+        await response.write_eof()
+        return response
+
+    async def startup(application):
+        state['inflight'] = asyncio.Semaphore(max(1, ASYNC_INFLIGHT))
+
+    application = web.Application(middlewares=[admission_middleware])
+    application.add_routes([
+        web.get('/', index_async),
+        web.post('/predict', predict_async),
+        web.post('/predict/batch', predict_batch_async),
+        web.get('/stats', stats_async)
+    ])
+    application.on_startup.append(startup)
+    return application
+
+
+def serve_async(argv):
+    """Run the dashboard on a single asyncio event loop (aiohttp)"""
+    parser = argparse.ArgumentParser(prog='web_dashboard.py serve-async',
+                                     description='Asyncio server (aiohttp)')
+    parser.add_argument('--bind', default=os.environ.get('YZDBHTS_BIND', '0.0.0.0:5000'))
+    args = parser.parse_args(argv)
+
+    try:
+        from aiohttp import web
+    except ImportError:
+        sys.exit("✗ 'serve-async' requires aiohttp: pip install aiohttp")
+
+    start_worker()
+    host, port = args.bind.rsplit(':', 1)
+    web.run_app(create_async_app(), host=host, port=int(port))
 
 
 # ===============================
@@ -1317,11 +2009,19 @@ def stats():
 # ===============================
 
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['serve']:
+        serve(sys.argv[2:])
+        sys.exit(0)
+    if sys.argv[1:2] == ['serve-async']:
+        serve_async(sys.argv[2:])
+        sys.exit(0)
+
     print("\n" + "=" * 70)
     print("🌿 PROFESSIONAL PLANT DISEASE DETECTION WEB DASHBOARD")
     print("=" * 70)
-    print("\n✓ Server starting...")
+    print("\n✓ Development server starting (use `python web_dashboard.py serve` in production)...")
     print("✓ Open in browser: http://localhost:5000")
     print("✓ Press CTRL+C to stop\n")
 
+    start_worker()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file